@@ -0,0 +1,41 @@
+"""add pg_trgm GIN indexes for user search
+
+Revision ID: 3f1c9a7d2e84
+Revises: abd2fd4e7d70
+Create Date: 2026-10-19 11:40:13.902311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2e84'
+down_revision: Union[str, Sequence[str], None] = 'abd2fd4e7d70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_COLUMNS = ['first_name', 'last_name', 'identity_number']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for column in TRGM_COLUMNS:
+        op.create_index(
+            f'ix_users_{column}_trgm',
+            'users',
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in TRGM_COLUMNS:
+        op.drop_index(f'ix_users_{column}_trgm', table_name='users')
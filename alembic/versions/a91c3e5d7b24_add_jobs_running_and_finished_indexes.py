@@ -0,0 +1,40 @@
+"""add jobs indexes for stale-job reclaim and retention cleanup
+
+Revision ID: a91c3e5d7b24
+Revises: e7b3c5a91f20
+Create Date: 2026-10-20 10:12:37.604219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91c3e5d7b24'
+down_revision: Union[str, Sequence[str], None] = 'e7b3c5a91f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nombre, columna, condición)
+INDEXES = [
+    ('ix_jobs_running_locked_at', 'locked_at', "status = 'running'"),
+    ('ix_jobs_finished_at', 'finished_at', "status IN ('succeeded', 'failed')"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sin bloquear a los workers que siguen tomando jobs (ver d4a7e1c9b352)
+    with op.get_context().autocommit_block():
+        for name, column, where in INDEXES:
+            op.create_index(name, 'jobs', [column], unique=False, postgresql_where=sa.text(where),
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='jobs', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,28 @@
+"""add users (is_active, id) index for paginated listing
+
+Revision ID: abd2fd4e7d70
+Revises: 5b4e8c1bbea9
+Create Date: 2026-10-19 11:02:47.530219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'abd2fd4e7d70'
+down_revision: Union[str, Sequence[str], None] = '5b4e8c1bbea9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_is_active_id', 'users', ['is_active', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_is_active_id', table_name='users')
@@ -0,0 +1,53 @@
+"""add indexes for foreign key lookups
+
+Revision ID: d4a7e1c9b352
+Revises: 8c2d4e6f1a3b
+Create Date: 2026-10-19 16:05:41.220874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7e1c9b352'
+down_revision: Union[str, Sequence[str], None] = '8c2d4e6f1a3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nombre, tabla, columnas)
+INDEXES = [
+    ('ix_organization_employees_org_id_user_id', 'organization_employees', ['org_id', 'user_id']),
+    ('ix_organization_employees_user_id', 'organization_employees', ['user_id']),
+    ('ix_org_employee_roles_org_role_id', 'org_employee_roles', ['org_role_id']),
+    ('ix_organization_roles_org_id', 'organization_roles', ['org_id']),
+    ('ix_organizations_owner_id', 'organizations', ['owner_id']),
+    ('ix_products_org_id_is_active', 'products', ['org_id', 'is_active']),
+    ('ix_accounts_user_id', 'accounts', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY no bloquea las escrituras, pero no puede ejecutarse dentro de una
+    # transacción. Si una creación falla queda un índice INVALID: eliminarlo y reintentar.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+        # (org_id, is_active) también resuelve WHERE org_id = ?
+        op.drop_index('ix_products_org_id', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_org_id', 'products', ['org_id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,33 @@
+"""add version columns for optimistic locking
+
+Revision ID: e7b3c5a91f20
+Revises: d4a7e1c9b352
+Create Date: 2026-10-19 17:20:08.514633
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3c5a91f20'
+down_revision: Union[str, Sequence[str], None] = 'd4a7e1c9b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ['products', 'organizations']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Un DEFAULT constante no reescribe la tabla (PostgreSQL 11+)
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_column(table, 'version')
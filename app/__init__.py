@@ -1,6 +1,11 @@
 from pyramid.config import Configurator
-from pyramid.response import Response
-from app.database import engine, Base
+from pyramid.tweens import INGRESS
+from pyramid.settings import asbool
+from app.database import engine, replica_engine, Base, log_engine_settings
+from app.metrics import instrument_engine, start_metrics_sync
+from app import query_debug, slow_queries
+from app.catalog_cache import catalog_cache
+from app.db_routing import replica_monitor
 from app.models.user import User
 from app.models.account import Account
 from app.models.organization import Organization, OrganizationRole, OrganizationEmployee
@@ -8,40 +13,76 @@ from app.models.product import Product
 from app.models.identity_type import IdentityType
 from app.models.gender import Gender
 from app.models.country import Country
+from app.models.revoked_token import RevokedToken
+from app.models.job import Job
 
 
 # Create tables
 # Base.metadata.create_all(bind=engine)
 
+def start_background_services():
+    """Start the per-process background threads (once per worker process)"""
+    # Catálogos en memoria + LISTEN para invalidación entre procesos
+    catalog_cache.start()
+    
+    # Monitor de lag de la réplica de lectura (si DATABASE_REPLICA_URL está configurada)
+    if replica_monitor is not None:
+        replica_monitor.start()
+    
+    # Snapshot de métricas para sumar los workers en /metrics (solo modo prefork)
+    start_metrics_sync()
+
 def main(global_config, **settings):
     config = Configurator(settings=settings)
+    log_engine_settings()
+    
+    # Renderer JSON rápido (orjson si está instalado) con soporte de Decimal/datetime
+    config.add_renderer('json', 'app.renderers.JSONRenderer')
+    
+    # Límite de tamaño del cuerpo por ruta (view_config max_body_size), 413 antes de leerlo
+    config.add_view_deriver('app.request_body.body_size_limit')
+    
+    # Autenticación JWT una sola vez por request (expone request.user_id)
+    config.add_tween('app.middleware.jwt_middleware.jwt_tween_factory')
     
-    # CORS Configuration
-    def add_cors_headers(event):
-        response = event.response
-        response.headers.update({
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'POST, GET, OPTIONS, PUT, DELETE',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization',
-            'Access-Control-Max-Age': '3600',
-        })
+    # Sesión de base de datos por request: commit/rollback/close automáticos
+    config.add_request_method('app.middleware.db_middleware.get_dbsession', 'dbsession', reify=True)
+    config.add_tween('app.middleware.db_middleware.db_session_tween_factory')
     
-    config.add_subscriber(add_cors_headers, 'pyramid.events.NewResponse')
+    # Compresión gzip/br de respuestas grandes según Accept-Encoding
+    config.add_tween('app.middleware.compression_middleware.compression_tween_factory')
     
-    # Handle preflight requests
-    config.add_route('cors_options', '/{path_info:.*}', request_method='OPTIONS')
+    # Detector de N+1 y presupuestos de consultas por ruta (solo con QUERY_DEBUG)
+    if query_debug.QUERY_DEBUG:
+        query_debug.instrument_engine(engine)
+        if replica_engine is not None:
+            query_debug.instrument_engine(replica_engine)
+        config.add_tween('app.query_debug.query_debug_tween_factory')
     
-    def cors_options_handler(request):
-        return Response(status=200)
+    # Registro de consultas lentas (SLOW_QUERY_MS) con EXPLAIN opcional
+    slow_queries.instrument_engine(engine)
+    if replica_engine is not None:
+        slow_queries.instrument_engine(replica_engine)
     
-    config.add_view(cors_options_handler, route_name='cors_options')
+    # Métricas por ruta (latencia, estado, consultas y tiempo SQL); expuestas en /metrics
+    instrument_engine(engine, 'primary')
+    if replica_engine is not None:
+        instrument_engine(replica_engine, 'replica')
+    config.add_tween('app.middleware.metrics_middleware.metrics_tween_factory')
     
+    # CORS: responde los preflight antes del ruteo (el tween más externo)
+    config.add_tween('app.middleware.cors_middleware.cors_tween_factory', under=INGRESS)
+    
+    config.add_route('metrics', '/metrics', request_method='GET')
+
     # ==================== RUTAS PÚBLICAS (sin autenticación) ====================
     config.add_route('list_public_organizations', '/api/public/organizations', request_method='GET')
     config.add_route('list_products_public', '/api/public/organizations/{org_id}/products', request_method='GET')
 
     # ==================== User routes ====================
     config.add_route('create_user', '/api/users', request_method='POST')
+    config.add_route('bulk_create_users', '/api/users/bulk', request_method='POST')
+    config.add_route('search_users', '/api/users/search', request_method='GET')  # antes de get_user
     config.add_route('get_user', '/api/users/{id}', request_method='GET')
     config.add_route('list_users', '/api/users', request_method='GET')
     config.add_route('update_user', '/api/users/{id}', request_method='PUT')
@@ -78,6 +119,15 @@ def main(global_config, **settings):
     config.add_route('update_product', '/api/organizations/{org_id}/products/{product_id}', request_method='PUT')
     config.add_route('delete_product', '/api/organizations/{org_id}/products/{product_id}', request_method='DELETE')
     
+    # ==================== Job routes ====================
+    config.add_route('get_job', '/api/jobs/{job_id}', request_method='GET')
+
+    # ==================== Admin routes ====================
+    config.add_route('list_slow_queries', '/api/admin/slow-queries', request_method='GET')
+
+    # ==================== Catalogs Routes ====================
+    config.add_route('list_catalogs', '/api/catalogs', request_method='GET')
+
     # ==================== Identity Types Routes ====================
     config.add_route('list_identity_types', '/api/identity-types', request_method='GET')
     config.add_route('create_identity_type', '/api/identity-types', request_method='POST')
@@ -102,4 +152,8 @@ def main(global_config, **settings):
     # Scan all view modules to register views
     config.scan('app.views')
     
+    # Con prefork (main.py) los hilos de fondo se inician en cada worker tras el fork
+    if not asbool(settings.get('app.defer_background_services', False)):
+        start_background_services()
+    
     return config.make_wsgi_app()
\ No newline at end of file
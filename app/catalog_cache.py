@@ -0,0 +1,163 @@
+import os
+import time
+import hashlib
+import select
+import logging
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import text
+from app.database import engine, SessionFactory
+from app.renderers import dumps
+from app.models.country import Country
+from app.models.gender import Gender
+from app.models.identity_type import IdentityType
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+CHANNEL = 'catalog_changes'
+LISTEN_TIMEOUT = float(os.getenv('CATALOG_LISTEN_TIMEOUT', 30))
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+
+COUNTRY_FIELDS = ('id', 'code', 'name', 'phone_code', 'is_active')
+GENDER_FIELDS = ('id', 'code', 'name', 'is_active')
+IDENTITY_TYPE_FIELDS = ('id', 'code', 'name', 'is_active')
+
+
+class CatalogSnapshot:
+    """Immutable view of the three catalogs at a given version"""
+
+    def __init__(self, version, countries, genders, identity_types):
+        self.version = version
+
+        self.countries_by_id = {c['id']: c for c in countries}
+        self.countries_by_code = {c['code']: c for c in countries}
+        # Countries with NULL is_active are treated as active
+        self.active_countries = tuple(c for c in countries if c['is_active'] is not False)
+
+        self.genders_by_id = {g['id']: g for g in genders}
+        self.genders_by_code = {g['code']: g for g in genders}
+        self.active_genders = tuple(g for g in genders if g['is_active'] is True)
+
+        self.identity_types_by_id = {it['id']: it for it in identity_types}
+        self.identity_types_by_code = {it['code']: it for it in identity_types}
+        self.active_identity_types = tuple(it for it in identity_types if it['is_active'] is True)
+
+        # Pre-serialized /api/catalogs payload; the ETag is a content hash so
+        # every worker produces the same one for the same data.
+        self.bootstrap_body = dumps({
+            'countries': self.active_countries,
+            'genders': self.active_genders,
+            'identity_types': self.active_identity_types
+        })
+        self.etag = hashlib.sha1(self.bootstrap_body).hexdigest()
+
+
+def _load_rows(db, model, fields):
+    columns = [getattr(model, f) for f in fields]
+    return [dict(zip(fields, row)) for row in db.query(*columns).order_by(model.id).all()]
+
+
+class CatalogCache:
+    """Versioned in-process cache of countries, genders and identity types.
+
+    Writers call invalidate(db) inside their transaction; that marks this
+    process stale and sends a NOTIFY that other processes receive on commit
+    through their listener thread.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._version = 0
+        self._stale = True
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def get(self) -> CatalogSnapshot:
+        """Return the current snapshot, reloading it if it was invalidated"""
+        if self._stale or self._snapshot is None:
+            self.reload()
+        return self._snapshot
+
+    def reload(self):
+        """Load the catalogs from the database into a new snapshot"""
+        with self._lock:
+            if not self._stale and self._snapshot is not None:
+                return
+            # Cleared before reading so a NOTIFY during the load marks it stale again
+            self._stale = False
+            db = SessionFactory()
+            try:
+                countries = _load_rows(db, Country, COUNTRY_FIELDS)
+                genders = _load_rows(db, Gender, GENDER_FIELDS)
+                identity_types = _load_rows(db, IdentityType, IDENTITY_TYPE_FIELDS)
+            except Exception:
+                self._stale = True
+                raise
+            finally:
+                db.close()
+
+            self._version += 1
+            self._snapshot = CatalogSnapshot(self._version, countries, genders, identity_types)
+            log.debug("Catalog cache loaded (version %s)", self._version)
+
+    def mark_stale(self):
+        self._stale = True
+
+    def invalidate(self, db):
+        """Invalidate this process now and every listening process on commit"""
+        db.execute(text("SELECT pg_notify(:channel, '')"), {'channel': CHANNEL})
+        self.mark_stale()
+
+    def start(self):
+        """Warm the cache and start the LISTEN thread for this process"""
+        try:
+            self.reload()
+        except Exception:
+            log.exception("Could not preload catalogs, they will load on first use")
+
+        if self._listener is None or not self._listener.is_alive():
+            self._listener = threading.Thread(
+                target=self._listen, name='catalog-listener', daemon=True
+            )
+            self._listener.start()
+
+    def _listen(self):
+        delay = RECONNECT_DELAY
+        while True:
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                raw.detach()  # dedicated connection, never returned to the pool
+                conn = raw.connection
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+
+                # Anything may have changed while we were not listening
+                self.mark_stale()
+                delay = RECONNECT_DELAY
+
+                while True:
+                    if select.select([conn], [], [], LISTEN_TIMEOUT) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self.mark_stale()
+            except Exception:
+                log.exception("Catalog listener disconnected, retrying in %ss", delay)
+                self.mark_stale()
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,115 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from app.models.product import Product
+
+load_dotenv()
+
+# Up to this many rows totals are exact; above it they come from the planner
+COUNT_EXACT_THRESHOLD = int(os.getenv('COUNT_EXACT_THRESHOLD', 10000))
+# Bounds how stale a cached count can be when another process wrote the rows
+COUNT_CACHE_TTL = float(os.getenv('COUNT_CACHE_TTL', 30))
+COUNT_CACHE_SIZE = 10000
+
+
+def planner_estimate(db, query):
+    """Row estimate for the query from EXPLAIN (no rows are read)"""
+    compiled = query.statement.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={'render_postcompile': True}
+    )
+    plan = db.connection().exec_driver_sql(
+        'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params
+    ).scalar()
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(db, query, threshold=COUNT_EXACT_THRESHOLD):
+    """Return (total, is_estimate) for the rows the query matches.
+
+    The exact count stops after threshold + 1 rows, so it is cheap however
+    large the table is; past that, the planner's estimate is returned
+    (never below threshold + 1, which is known to be a lower bound).
+    """
+    query = query.order_by(None)
+    bounded = query.limit(threshold + 1).subquery()
+    exact = db.query(func.count()).select_from(bounded).scalar()
+    if exact <= threshold:
+        return exact, False
+    return max(planner_estimate(db, query), threshold + 1), True
+
+
+class CountCache:
+    """Per-process cache of counts grouped by owner key (e.g. an org id).
+
+    invalidate(key) drops every count stored for that key. Entries expire
+    after COUNT_CACHE_TTL, which bounds staleness for writes made by other
+    processes.
+    """
+
+    def __init__(self, ttl=COUNT_CACHE_TTL, maxsize=COUNT_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}  # key -> {variante: (expira, total, is_estimate)}
+        self._lock = threading.Lock()
+
+    def get(self, key, variant, load):
+        """Cached (total, is_estimate), calling load() on a miss"""
+        now = time.monotonic()
+        entry = self._entries.get(key, {}).get(variant)
+        if entry is not None and entry[0] > now:
+            return entry[1], entry[2]
+
+        total, is_estimate = load()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.maxsize:
+                # Simple bound: drop the oldest inserted key
+                self._entries.pop(next(iter(self._entries)))
+            self._entries.setdefault(key, {})[variant] = (now + self.ttl, total, is_estimate)
+        return total, is_estimate
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Productos por organización: key = org_id, variante = solo activos o todos
+product_counts = CountCache()
+
+
+def product_count(db, org_id, active_only):
+    """(total, is_estimate) of an organization's products, cached per org"""
+    def load():
+        query = db.query(Product.id).filter(Product.org_id == org_id)
+        if active_only:
+            query = query.filter(Product.is_active == True)
+        return count_rows(db, query)
+    return product_counts.get(int(org_id), active_only, load)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_product_writes(session, flush_context):
+    """Remember which organizations' products changed in this transaction"""
+    orgs = None
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Product) and obj.org_id is not None:
+            if orgs is None:
+                orgs = session.info.setdefault('product_count_orgs', set())
+            orgs.add(int(obj.org_id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_product_counts(session):
+    for org_id in session.info.pop('product_count_orgs', ()):
+        product_counts.invalidate(org_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_product_writes(session):
+    session.info.pop('product_count_orgs', None)
@@ -2,16 +2,74 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.ext.declarative import declarative_base
 import os
+import logging
 from dotenv import load_dotenv
+from app.metrics import TimedQueuePool
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
+def env_flag(name, default=False):
+    """Read a boolean environment variable (1/true/yes/on)"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Optional streaming replica used for GET requests (see app.middleware.db_middleware)
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+
+# Waitress serves each request on one of its threads, so the pool is sized
+# to give every thread a connection without waiting.
+WAITRESS_THREADS = int(os.getenv('WAITRESS_THREADS', 4))
+
+DB_ECHO = env_flag('DB_ECHO', False)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', WAITRESS_THREADS))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 2))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+DB_POOL_PRE_PING = env_flag('DB_POOL_PRE_PING', True)
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 30000))  # ms, 0 = sin límite
+DB_APPLICATION_NAME = os.getenv('DB_APPLICATION_NAME', 'product_admin_backend')
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+connect_args = {'application_name': DB_APPLICATION_NAME}
+if DB_STATEMENT_TIMEOUT > 0:
+    connect_args['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'
+
+engine_options = dict(
+    echo=DB_ECHO,
+    poolclass=TimedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE,
+    connect_args=connect_args
+)
+
+engine = create_engine(DATABASE_URL, pool_logging_name='primary', **engine_options)
+replica_engine = (
+    create_engine(DATABASE_REPLICA_URL, pool_logging_name='replica', **engine_options)
+    if DATABASE_REPLICA_URL else None
+)
+SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = scoped_session(SessionFactory)
 Base = declarative_base()
 
+def log_engine_settings():
+    """Log the effective engine settings once at startup"""
+    log.info(
+        "Database engine: echo=%s pool_size=%s max_overflow=%s pool_timeout=%ss "
+        "pool_pre_ping=%s pool_recycle=%ss statement_timeout=%sms application_name=%s "
+        "(waitress threads=%s)",
+        DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING,
+        DB_POOL_RECYCLE, DB_STATEMENT_TIMEOUT, DB_APPLICATION_NAME, WAITRESS_THREADS
+    )
+    if replica_engine is not None:
+        log.info("Read replica enabled for GET requests: %r", replica_engine.url)
+
 def get_db():
     db = SessionLocal()
     try:
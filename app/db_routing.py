@@ -0,0 +1,111 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from dotenv import load_dotenv
+from sqlalchemy import text
+from app.database import replica_engine
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))  # segundos
+REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 2))
+READ_STICKINESS = float(os.getenv('DB_READ_STICKINESS', 5))  # segundos tras una escritura
+STICKY_SLOTS = 65536  # usuarios con escrituras recientes, compartido entre workers
+
+# An idle primary sends no WAL, so replay timestamps age without real lag;
+# treat "everything received has been replayed" as zero lag.
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaMonitor:
+    """Poll the replica's replication lag and flag it unhealthy past a threshold"""
+
+    def __init__(self, engine, max_lag=REPLICA_MAX_LAG, interval=REPLICA_CHECK_INTERVAL):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag = None
+        self.healthy = False
+        self._thread = None
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                lag = float(conn.execute(REPLICA_LAG_SQL).scalar())
+        except Exception:
+            log.warning("Replica lag check failed, routing reads to the primary", exc_info=True)
+            self.lag = None
+            self.healthy = False
+            return
+
+        healthy = lag <= self.max_lag
+        if healthy != self.healthy:
+            log.warning("Replica %s (lag %.2fs, max %.2fs)",
+                        "healthy" if healthy else "lagging", lag, self.max_lag)
+        self.lag = lag
+        self.healthy = healthy
+
+    def start(self):
+        """Start the polling thread for this process"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='replica-monitor', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self.check()
+            time.sleep(self.interval)
+
+
+class StickyReads:
+    """Per-user window after a write during which reads go to the primary.
+
+    The deadlines live in an anonymous shared-memory array created when the
+    app is loaded, so prefork workers (forked after loading) all see every
+    worker's writes. Users are hashed into a fixed number of slots; a
+    collision only sends another user's reads to the primary, never a read
+    to the replica too early. Separate hosts do not share the array.
+    """
+
+    def __init__(self, window=READ_STICKINESS, slots=STICKY_SLOTS):
+        self.window = window
+        # Wall-clock deadlines: comparable across processes
+        self._until = multiprocessing.RawArray('d', slots)
+
+    def _slot(self, user_id):
+        return hash(user_id) % len(self._until)
+
+    def mark_write(self, user_id):
+        if user_id is None or self.window <= 0:
+            return
+        self._until[self._slot(user_id)] = time.time() + self.window
+
+    def is_sticky(self, user_id) -> bool:
+        if user_id is None:
+            return False
+        return self._until[self._slot(user_id)] > time.time()
+
+
+replica_monitor = ReplicaMonitor(replica_engine) if replica_engine is not None else None
+sticky_reads = StickyReads()
+
+def read_engine_for(request):
+    """Return the replica engine if this request may read from it, else None"""
+    if replica_monitor is None or request.method not in ('GET', 'HEAD'):
+        return None
+    if not replica_monitor.healthy:
+        return None
+    if sticky_reads.is_sticky(getattr(request, 'user_id', None)):
+        return None
+    return replica_monitor.engine
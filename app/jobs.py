@@ -0,0 +1,329 @@
+import os
+import time
+import random
+import select
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import text
+from app.database import engine, SessionFactory
+from app.models.job import Job
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+CHANNEL = 'jobs'
+JOB_WORKER_THREADS = int(os.getenv('JOB_WORKER_THREADS', 2))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 5))       # segundos sin NOTIFY
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BASE = float(os.getenv('JOB_RETRY_BASE', 10))            # 10s, 20s, 40s...
+JOB_RETRY_MAX = float(os.getenv('JOB_RETRY_MAX', 3600))
+# A running job whose worker stopped updating it for this long is requeued
+JOB_LOCK_TIMEOUT = float(os.getenv('JOB_LOCK_TIMEOUT', 900))
+# How often a worker refreshes locked_at while a handler runs
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', JOB_LOCK_TIMEOUT / 3))
+# Succeeded and failed jobs are deleted this many days after they finish (0 = keep)
+JOB_RETENTION_DAYS = float(os.getenv('JOB_RETENTION_DAYS', 7))
+JOB_CLEANUP_INTERVAL = float(os.getenv('JOB_CLEANUP_INTERVAL', 3600))
+JOB_CLEANUP_BATCH = 1000
+
+handlers = {}
+
+
+def job_handler(kind):
+    """Register a function as the handler for jobs of this kind.
+
+        @job_handler('delete_organization')
+        def delete_organization(ctx):
+            ...
+            ctx.progress(50, 'Productos eliminados')
+            return {'deleted': n}
+
+    The return value is stored as the job result (JSON). Raising an
+    exception retries the job with exponential backoff.
+    """
+    def register(fn):
+        handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(db, kind, payload=None, user_id=None, max_attempts=JOB_MAX_ATTEMPTS):
+    """Add a job in the caller's transaction; workers are woken on commit"""
+    job = Job(kind=kind, payload=payload or {}, user_id=user_id, status='queued',
+              attempts=0, max_attempts=max_attempts, progress=0, run_at=datetime.utcnow())
+    db.add(job)
+    db.flush()
+    db.execute(text("SELECT pg_notify(:channel, '')"), {'channel': CHANNEL})
+    return job
+
+
+def format_job(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'progress_message': job.progress_message,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at
+    }
+
+
+def purge_finished_jobs(db, older_than, batch=JOB_CLEANUP_BATCH):
+    """Delete succeeded/failed jobs finished before older_than, in small batches.
+
+    Each batch is its own transaction so the deletes never hold many row
+    locks; rows another worker is already deleting are skipped.
+    """
+    deleted = 0
+    while True:
+        count = db.execute(text("""
+            DELETE FROM jobs WHERE id IN (
+                SELECT id FROM jobs
+                WHERE status IN ('succeeded', 'failed') AND finished_at < :older_than
+                LIMIT :batch FOR UPDATE SKIP LOCKED
+            )
+        """), {'older_than': older_than, 'batch': batch}).rowcount
+        db.commit()
+        deleted += count
+        if count < batch:
+            return deleted
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given attempt number"""
+    delay = min(JOB_RETRY_BASE * 2 ** (attempts - 1), JOB_RETRY_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobContext:
+    """What a handler gets: the payload, a session and progress reporting"""
+
+    def __init__(self, job_id, kind, payload, attempts, db, worker_id):
+        self.job_id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.db = db
+        self.worker_id = worker_id
+
+    def progress(self, percent, message=None):
+        """Publish progress immediately, outside the handler's transaction"""
+        db = SessionFactory()
+        try:
+            db.query(Job).filter(Job.id == self.job_id, Job.locked_by == self.worker_id).update(
+                {'progress': max(0, min(100, int(percent))), 'progress_message': message,
+                 'locked_at': datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+class JobWorker:
+    """Claims jobs with FOR UPDATE SKIP LOCKED and runs them on N threads"""
+
+    def __init__(self, threads=JOB_WORKER_THREADS):
+        self.threads = threads
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def claim(self, worker_id):
+        """Lock the next due job and mark it running; None if the queue is empty"""
+        db = SessionFactory()
+        try:
+            while True:
+                now = datetime.utcnow()
+                job = self._next_job(db, now)
+                if job is None:
+                    db.rollback()
+                    return None
+                if job.status != 'running':
+                    break
+                if job.attempts < job.max_attempts:
+                    log.warning("Job %s: worker %s stopped responding, requeued", job.id, job.locked_by)
+                    break
+                # The job keeps taking its worker down: do not run it again
+                log.error("Job %s (%s): worker %s stopped responding on the last attempt, failed",
+                          job.id, job.kind, job.locked_by)
+                job.status = 'failed'
+                job.error = 'El worker dejó de responder en el último intento'
+                job.locked_by = None
+                job.finished_at = now
+                db.commit()
+
+            job.status = 'running'
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.locked_at = now
+            job.started_at = job.started_at or now
+            db.commit()
+            return job.id, job.kind, job.payload, job.attempts, job.max_attempts
+        finally:
+            db.close()
+
+    def _next_job(self, db, now):
+        """Lock a due queued job, else a running one whose worker went silent.
+
+        Two queries instead of one OR so each uses its partial index
+        (ix_jobs_queued_run_at, ix_jobs_running_locked_at).
+        """
+        job = (
+            db.query(Job)
+            .filter(Job.status == 'queued', Job.run_at <= now)
+            .order_by(Job.run_at, Job.id)
+            .with_for_update(skip_locked=True)
+            .limit(1)
+            .first()
+        )
+        if job is not None:
+            return job
+        return (
+            db.query(Job)
+            .filter(Job.status == 'running',
+                    Job.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT))
+            .order_by(Job.locked_at)
+            .with_for_update(skip_locked=True)
+            .limit(1)
+            .first()
+        )
+
+    def _finish(self, job_id, worker_id, **values):
+        db = SessionFactory()
+        try:
+            db.query(Job).filter(Job.id == job_id, Job.locked_by == worker_id).update(
+                values, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _heartbeat(self, worker_id, job_id, done):
+        """Refresh locked_at until done is set, so a long job is not reclaimed"""
+        while not done.wait(JOB_HEARTBEAT_INTERVAL):
+            try:
+                self._finish(job_id, worker_id, locked_at=datetime.utcnow())
+            except Exception:
+                log.warning("Job %s: heartbeat failed", job_id, exc_info=True)
+
+    def run_job(self, worker_id, job_id, kind, payload, attempts, max_attempts):
+        handler = handlers.get(kind)
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(worker_id, job_id, done),
+                         name=f'jobs-heartbeat-{job_id}', daemon=True).start()
+        db = SessionFactory()
+        try:
+            if handler is None:
+                raise LookupError(f'No handler registered for job kind {kind!r}')
+            result = handler(JobContext(job_id, kind, payload, attempts, db, worker_id))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if attempts < max_attempts and handler is not None:
+                delay = retry_delay(attempts)
+                log.warning("Job %s (%s) failed on attempt %s, retrying in %.0fs: %s",
+                            job_id, kind, attempts, delay, e)
+                self._finish(job_id, worker_id, status='queued', error=str(e), locked_by=None,
+                             run_at=datetime.utcnow() + timedelta(seconds=delay))
+            else:
+                log.exception("Job %s (%s) failed permanently", job_id, kind)
+                self._finish(job_id, worker_id, status='failed', error=str(e), locked_by=None,
+                             finished_at=datetime.utcnow())
+            return
+        finally:
+            done.set()
+            db.close()
+
+        self._finish(job_id, worker_id, status='succeeded', result=result, error=None,
+                     progress=100, locked_by=None, finished_at=datetime.utcnow())
+        log.info("Job %s (%s) succeeded", job_id, kind)
+
+    def _work(self, index):
+        worker_id = f'{self.name}/{index}'
+        while not self._stopping.is_set():
+            try:
+                claimed = self.claim(worker_id)
+            except Exception:
+                log.exception("Could not claim a job")
+                claimed = None
+            if claimed is None:
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self.run_job(worker_id, *claimed)
+
+    def _listen(self):
+        """Wake idle threads as soon as a job is enqueued (NOTIFY on commit)"""
+        while not self._stopping.is_set():
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                raw.detach()
+                conn = raw.connection
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], JOB_POLL_INTERVAL) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self._wakeup.set()
+            except Exception:
+                log.exception("Job listener disconnected, falling back to polling")
+                time.sleep(JOB_POLL_INTERVAL)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+    def _cleanup(self):
+        """Delete finished jobs past JOB_RETENTION_DAYS every JOB_CLEANUP_INTERVAL"""
+        while not self._stopping.is_set():
+            db = SessionFactory()
+            try:
+                older_than = datetime.utcnow() - timedelta(days=JOB_RETENTION_DAYS)
+                deleted = purge_finished_jobs(db, older_than)
+                if deleted:
+                    log.info("Deleted %d finished job(s) older than %s days", deleted, JOB_RETENTION_DAYS)
+            except Exception:
+                db.rollback()
+                log.exception("Could not delete finished jobs")
+            finally:
+                db.close()
+            self._stopping.wait(JOB_CLEANUP_INTERVAL)
+
+    def stop(self):
+        """Finish the running jobs, then exit"""
+        self._stopping.set()
+        self._wakeup.set()
+
+    def run(self):
+        log.info("Job worker %s started with %d thread(s), handlers: %s",
+                 self.name, self.threads, ', '.join(sorted(handlers)))
+        threading.Thread(target=self._listen, name='jobs-listener', daemon=True).start()
+        if JOB_RETENTION_DAYS > 0:
+            threading.Thread(target=self._cleanup, name='jobs-cleanup', daemon=True).start()
+        workers = [
+            threading.Thread(target=self._work, args=(i,), name=f'jobs-{i}')
+            for i in range(self.threads)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        log.info("Job worker %s stopped", self.name)
@@ -0,0 +1,374 @@
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+try:
+    import fcntl
+except ImportError:  # Windows: no prefork workers
+    fcntl = None
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+# Fixed buckets keep observe() to a bisect plus two additions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+# Prefork: where each worker leaves its snapshot, and how often it refreshes it
+METRICS_DIR = os.getenv('METRICS_DIR', 'var/metrics')
+METRICS_SYNC_INTERVAL = float(os.getenv('METRICS_SYNC_INTERVAL', 5))
+
+
+class Histogram:
+    """Fixed-bucket histogram (per-bucket counts, made cumulative on render)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_list(self):
+        return [self.counts, self.sum, self.count]
+
+    def merge(self, data):
+        counts, total, count = data
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+        self.count += count
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class RequestStats:
+    """Database activity of the request being served on this thread"""
+
+    __slots__ = ('route_name', 'queries', 'db_time', 'statements', 'relationship')
+
+    def __init__(self):
+        self.route_name = None
+        self.queries = 0
+        self.db_time = 0.0
+        # Only filled in by app.query_debug when QUERY_DEBUG is on
+        self.statements = None
+        self.relationship = None
+
+
+_local = threading.local()
+
+def current_request_stats():
+    """Return the RequestStats of the current request, or None outside one"""
+    return getattr(_local, 'stats', None)
+
+def begin_request():
+    stats = _local.stats = RequestStats()
+    return stats
+
+def end_request():
+    _local.stats = None
+
+
+class MetricsRegistry:
+    """Per-process metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.db_time = {}
+        self.queries = {}
+        self.statuses = {}
+        self.pool_wait = {}
+        self.engines = {}
+
+    def observe_request(self, route, status, duration, stats):
+        with self._lock:
+            if route not in self.latency:
+                self.latency[route] = Histogram(LATENCY_BUCKETS)
+                self.db_time[route] = Histogram(LATENCY_BUCKETS)
+                self.queries[route] = Histogram(QUERY_COUNT_BUCKETS)
+            self.latency[route].observe(duration)
+            self.db_time[route].observe(stats.db_time)
+            self.queries[route].observe(stats.queries)
+            key = (route, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def pool_gauges(self):
+        """{pool: (checked out, size)} of this process's engines"""
+        return dict(
+            (name, (engine.pool.checkedout(), engine.pool.size()))
+            for name, engine in self.engines.items()
+        )
+
+    def snapshot(self):
+        """Plain-data copy of the counters and histograms (JSON serializable)"""
+        with self._lock:
+            return {
+                'latency': dict((k, h.to_list()) for k, h in self.latency.items()),
+                'db_time': dict((k, h.to_list()) for k, h in self.db_time.items()),
+                'queries': dict((k, h.to_list()) for k, h in self.queries.items()),
+                'pool_wait': dict((k, h.to_list()) for k, h in self.pool_wait.items()),
+                'statuses': [[route, status, count] for (route, status), count in self.statuses.items()],
+            }
+
+    def merge(self, snapshot):
+        """Add another process's snapshot to this registry"""
+        with self._lock:
+            for field, buckets in (('latency', LATENCY_BUCKETS), ('db_time', LATENCY_BUCKETS),
+                                   ('queries', QUERY_COUNT_BUCKETS), ('pool_wait', POOL_WAIT_BUCKETS)):
+                histograms = getattr(self, field)
+                for key, data in snapshot.get(field, {}).items():
+                    if key not in histograms:
+                        histograms[key] = Histogram(buckets)
+                    histograms[key].merge(data)
+            for route, status, count in snapshot.get('statuses', ()):
+                key = (route, status)
+                self.statuses[key] = self.statuses.get(key, 0) + count
+
+    def observe_pool_wait(self, pool_name, seconds):
+        with self._lock:
+            histogram = self.pool_wait.get(pool_name)
+            if histogram is None:
+                histogram = self.pool_wait[pool_name] = Histogram(POOL_WAIT_BUCKETS)
+            histogram.observe(seconds)
+
+    def render(self, pool_gauges=None):
+        """Prometheus text; pool_gauges defaults to this process's engines"""
+        if pool_gauges is None:
+            pool_gauges = self.pool_gauges()
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_request_duration_seconds Request latency by route',
+                      '# TYPE http_request_duration_seconds histogram']
+            for route, histogram in sorted(self.latency.items()):
+                lines += histogram.render('http_request_duration_seconds', f'route="{route}"')
+
+            lines += ['# HELP http_requests_total Responses by route and status',
+                      '# TYPE http_requests_total counter']
+            for (route, status), count in sorted(self.statuses.items()):
+                lines.append(f'http_requests_total{{route="{route}",status="{status}"}} {count}')
+
+            lines += ['# HELP http_request_db_queries SQL statements executed per request',
+                      '# TYPE http_request_db_queries histogram']
+            for route, histogram in sorted(self.queries.items()):
+                lines += histogram.render('http_request_db_queries', f'route="{route}"')
+
+            lines += ['# HELP http_request_db_seconds Time spent in SQL per request',
+                      '# TYPE http_request_db_seconds histogram']
+            for route, histogram in sorted(self.db_time.items()):
+                lines += histogram.render('http_request_db_seconds', f'route="{route}"')
+
+            lines += ['# HELP db_pool_checkout_seconds Time to obtain a pooled connection',
+                      '# TYPE db_pool_checkout_seconds histogram']
+            for pool_name, histogram in sorted(self.pool_wait.items()):
+                lines += histogram.render('db_pool_checkout_seconds', f'pool="{pool_name}"')
+
+        lines += ['# HELP db_pool_checked_out Connections currently in use',
+                  '# TYPE db_pool_checked_out gauge']
+        for name, (checked_out, _) in sorted(pool_gauges.items()):
+            lines.append(f'db_pool_checked_out{{pool="{name}"}} {checked_out}')
+        lines += ['# HELP db_pool_size Configured pool size',
+                  '# TYPE db_pool_size gauge']
+        for name, (_, size) in sorted(pool_gauges.items()):
+            lines.append(f'db_pool_size{{pool="{name}"}} {size}')
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MultiprocessMetrics:
+    """Aggregate the registries of prefork workers through snapshot files.
+
+    Each worker writes its snapshot to METRICS_DIR/metrics-<pid>.json every
+    METRICS_SYNC_INTERVAL seconds, on every scrape it serves and when it
+    exits. render() sums every file, so a scrape returns the same series
+    whichever worker accepts it. Files of exited workers are folded into
+    metrics-archive.json (under a lock), which keeps counters monotonic
+    across rolling restarts; pool gauges only count live workers.
+    """
+
+    ARCHIVE = 'metrics-archive.json'
+
+    def __init__(self, registry, directory=METRICS_DIR, interval=METRICS_SYNC_INTERVAL):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._thread = None
+
+    def reset(self):
+        """Start from zero (the master calls this before forking the workers)"""
+        os.makedirs(self.directory, exist_ok=True)
+        for name in os.listdir(self.directory):
+            if name.startswith('metrics-') and name.endswith('.json'):
+                os.unlink(os.path.join(self.directory, name))
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def _write_json(self, path, data):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _read_json(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write(self):
+        """Publish this process's snapshot and fold the files of exited workers"""
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot = self.registry.snapshot()
+        snapshot['pool'] = self.registry.pool_gauges()
+        self._write_json(self._path(os.getpid()), snapshot)
+        self._fold_exited()
+
+    def _worker_files(self):
+        """(pid, path) of every worker snapshot in the directory"""
+        for name in os.listdir(self.directory):
+            if name.startswith('metrics-') and name.endswith('.json') and name != self.ARCHIVE:
+                pid = name[len('metrics-'):-len('.json')]
+                if pid.isdigit():
+                    yield int(pid), os.path.join(self.directory, name)
+
+    def _fold_exited(self):
+        exited = [(pid, path) for pid, path in self._worker_files() if not _pid_alive(pid)]
+        if not exited or fcntl is None:
+            return
+        with open(os.path.join(self.directory, 'archive.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # released when the file is closed
+            archive_path = os.path.join(self.directory, self.ARCHIVE)
+            archive = MetricsRegistry()
+            archive.merge(self._read_json(archive_path) or {})
+            folded = []
+            for pid, path in exited:
+                snapshot = self._read_json(path)  # None: another worker folded it first
+                if snapshot is not None:
+                    archive.merge(snapshot)
+                    folded.append(path)
+            if folded:
+                self._write_json(archive_path, archive.snapshot())
+                for path in folded:
+                    os.unlink(path)
+
+    def render(self):
+        self.write()
+        merged = MetricsRegistry()
+        pool_gauges = {}
+        archive = self._read_json(os.path.join(self.directory, self.ARCHIVE))
+        if archive is not None:
+            merged.merge(archive)
+        for pid, path in self._worker_files():
+            snapshot = self._read_json(path)
+            if snapshot is None:
+                continue
+            merged.merge(snapshot)
+            if _pid_alive(pid):
+                for name, (checked_out, size) in snapshot.get('pool', {}).items():
+                    total_out, total_size = pool_gauges.get(name, (0, 0))
+                    pool_gauges[name] = (total_out + checked_out, total_size + size)
+        return merged.render(pool_gauges)
+
+    def start(self):
+        """Start the sync thread for this process"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='metrics-sync', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except Exception:
+                log.warning("Could not write the metrics snapshot", exc_info=True)
+
+
+# Set by enable_multiprocess() in prefork mode; None = one process, render directly
+multiprocess_metrics = None
+
+
+def enable_multiprocess(directory=METRICS_DIR):
+    """Aggregate /metrics across prefork workers (called by the master before forking)"""
+    global multiprocess_metrics
+    multiprocess_metrics = MultiprocessMetrics(metrics, directory)
+    multiprocess_metrics.reset()
+    return multiprocess_metrics
+
+
+def start_metrics_sync():
+    """Start this worker's snapshot thread (no-op outside prefork mode)"""
+    if multiprocess_metrics is not None:
+        multiprocess_metrics.start()
+
+
+def render_metrics():
+    """/metrics body: this process, or every prefork worker combined"""
+    if multiprocess_metrics is not None:
+        return multiprocess_metrics.render()
+    return metrics.render()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_wait(self._orig_logging_name or 'primary', time.perf_counter() - start)
+
+
+def instrument_engine(engine, name):
+    """Count statements and DB time per request on this engine"""
+    metrics.engines[name] = engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request_stats()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += time.perf_counter() - context._metrics_start
+
@@ -0,0 +1,117 @@
+import os
+import gzip
+import zlib
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+load_dotenv()
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
+# Already-compressed media (images, archives, fonts...) is left alone
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+OFFERS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def _is_compressible(content_type):
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _add_vary(response, header):
+    vary = response.vary or ()
+    if header not in vary:
+        response.vary = tuple(vary) + (header,)
+
+
+def _choose_encoding(request):
+    # No header at all: don't assume the client can decode anything
+    if 'Accept-Encoding' not in request.headers:
+        return None
+    offers = request.accept_encoding.acceptable_offers(OFFERS)
+    return offers[0][0] if offers else None
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _compress_stream(app_iter, encoding):
+    """Compress a streaming app_iter chunk by chunk"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+    try:
+        for chunk in app_iter:
+            data = process(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        close = getattr(app_iter, 'close', None)
+        if close is not None:
+            close()
+
+
+def compression_tween_factory(handler, registry):
+    """Compress responses with br/gzip according to Accept-Encoding.
+
+    Buffered bodies are compressed when they reach COMPRESSION_MIN_SIZE;
+    streaming responses (no Content-Length) are compressed on the fly.
+    """
+
+    def compression_tween(request):
+        response = handler(request)
+
+        # A 304 has no body or Content-Type but must repeat the Vary the 200 carries,
+        # or caches would reuse one stored encoding for every client
+        if response.status_code == 304:
+            _add_vary(response, 'Accept-Encoding')
+            return response
+        if response.status_code == 204 or response.status_code < 200:
+            return response
+        if not _is_compressible(response.content_type) or response.content_encoding:
+            return response
+
+        # The representation now depends on Accept-Encoding, compressed or not
+        _add_vary(response, 'Accept-Encoding')
+
+        if request.method == 'HEAD':
+            return response
+        encoding = _choose_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.content_length is not None:
+            if response.content_length < COMPRESSION_MIN_SIZE:
+                return response
+            response.body = _compress(response.body, encoding)
+        else:
+            response.app_iter = _compress_stream(response.app_iter, encoding)
+            response.content_length = None
+
+        response.content_encoding = encoding
+        # A strong ETag must change with the encoding; a weak one still validates
+        etag = response.headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+    return compression_tween
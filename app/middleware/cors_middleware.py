@@ -0,0 +1,63 @@
+import os
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from dotenv import load_dotenv
+from pyramid.response import Response
+
+load_dotenv()
+
+# Comma-separated allowlist; entries may use wildcards (https://*.example.com)
+CORS_ORIGINS = tuple(o.strip() for o in os.getenv('CORS_ORIGIN', '*').split(',') if o.strip())
+# Browsers cap this (Chromium at 2h), but a long value still saves most preflights
+CORS_MAX_AGE = int(os.getenv('CORS_MAX_AGE', 86400))
+
+ALLOW_ANY_ORIGIN = '*' in CORS_ORIGINS
+ALLOW_METHODS = 'GET, POST, PUT, DELETE, OPTIONS'
+ALLOW_HEADERS = 'Content-Type, Authorization, If-None-Match, If-Match'
+EXPOSE_HEADERS = 'ETag'
+
+# Header values never change at runtime, so build them once
+RESPONSE_HEADERS = (('Access-Control-Expose-Headers', EXPOSE_HEADERS),)
+PREFLIGHT_HEADERS = (
+    ('Access-Control-Allow-Methods', ALLOW_METHODS),
+    ('Access-Control-Allow-Headers', ALLOW_HEADERS),
+    ('Access-Control-Max-Age', str(CORS_MAX_AGE)),
+)
+
+
+@lru_cache(maxsize=1024)
+def allowed_origin(origin):
+    """Value for Access-Control-Allow-Origin, or None if origin is not allowed"""
+    if ALLOW_ANY_ORIGIN:
+        return '*'
+    if origin and any(fnmatchcase(origin, pattern) for pattern in CORS_ORIGINS):
+        return origin
+    return None
+
+
+def _apply(response, origin, extra_headers):
+    allow = allowed_origin(origin)
+    if not ALLOW_ANY_ORIGIN:
+        # The answer depends on the Origin header; shared caches must key on it
+        vary = response.vary or ()
+        if 'Origin' not in vary:
+            response.vary = tuple(vary) + ('Origin',)
+    if allow is None:
+        return response
+    headers = response.headerlist
+    headers.append(('Access-Control-Allow-Origin', allow))
+    headers.extend(extra_headers)
+    return response
+
+
+def cors_tween_factory(handler, registry):
+    """Answer OPTIONS preflights directly and add CORS headers to responses"""
+
+    def cors_tween(request):
+        origin = request.headers.get('Origin')
+        if request.method == 'OPTIONS':
+            # No routing or view lookup for preflights
+            return _apply(Response(status=204), origin, PREFLIGHT_HEADERS)
+        return _apply(handler(request), origin, RESPONSE_HEADERS)
+
+    return cors_tween
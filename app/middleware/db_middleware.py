@@ -0,0 +1,48 @@
+from app.database import SessionFactory, SessionLocal
+from app.db_routing import read_engine_for, sticky_reads
+
+def get_dbsession(request):
+    """Create the session for this request (reified as request.dbsession).
+
+    GET/HEAD requests are bound to the read replica when one is configured,
+    healthy, and the user has not written within the stickiness window.
+    """
+    replica = read_engine_for(request)
+    if replica is not None:
+        return SessionFactory(bind=replica)
+    return SessionFactory()
+
+def db_session_tween_factory(handler, registry):
+    """Commit, roll back and close request.dbsession around every request.
+
+    Successful responses are committed and error responses (status >= 400)
+    or exceptions are rolled back. The session is always closed, so its
+    connection goes back to the pool whatever path the view took.
+    """
+
+    def db_session_tween(request):
+        try:
+            response = handler(request)
+            db = request.__dict__.get('dbsession')
+            if db is not None:
+                if response.status_code >= 400:
+                    db.rollback()
+                else:
+                    db.commit()
+                    if request.method not in ('GET', 'HEAD'):
+                        # Read-your-writes: this user's next reads go to the primary
+                        sticky_reads.mark_write(getattr(request, 'user_id', None))
+            return response
+        except Exception:
+            db = request.__dict__.get('dbsession')
+            if db is not None:
+                db.rollback()
+            raise
+        finally:
+            db = request.__dict__.get('dbsession')
+            if db is not None:
+                db.close()
+            # Drop any thread-local session opened outside request.dbsession
+            SessionLocal.remove()
+
+    return db_session_tween
@@ -1,19 +1,27 @@
 import jwt
 import os
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from app.renderers import json_response
+from app.middleware.token_revocation import revocation_list
 
 load_dotenv()
 
 SECRET = os.getenv('JWT_SECRET')
 ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
 EXPIRATION = int(os.getenv('JWT_EXPIRATION', 86400))
+TOKEN_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', 4096))
 
 def create_token(data: dict) -> str:
     """Create a JWT token"""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(seconds=EXPIRATION)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     
     encoded_jwt = jwt.encode(to_encode, SECRET, algorithm=ALGORITHM)
     return encoded_jwt
@@ -33,4 +41,88 @@ def extract_token(request):
     auth_header = request.headers.get('Authorization')
     if not auth_header or not auth_header.startswith('Bearer '):
         return None
-    return auth_header.split(' ')[1]
\ No newline at end of file
+    return auth_header.split(' ')[1]
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of token digest -> (payload, exp) for already verified tokens"""
+
+    def __init__(self, maxsize=TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key, payload):
+        exp = payload.get('exp')
+        if exp is None or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (payload, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache()
+
+def verify_token_cached(token: str) -> dict:
+    """Verify a JWT token, skipping the signature check for recently verified tokens"""
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = verify_token(token)
+        token_cache.put(key, payload)
+    return payload
+
+
+def jwt_tween_factory(handler, registry):
+    """Authenticate the request once and expose request.user_id / request.jwt_payload"""
+
+    def jwt_tween(request):
+        request.jwt_payload = None
+        request.user_id = None
+        request.auth_error = None
+
+        token = extract_token(request)
+        if token:
+            try:
+                payload = verify_token_cached(token)
+                if revocation_list.is_revoked(payload.get('jti')):
+                    raise Exception("Token revocado")
+                request.jwt_payload = payload
+                request.user_id = payload.get('user_id')
+            except Exception as e:
+                request.auth_error = str(e)
+
+        return handler(request)
+
+    return jwt_tween
+
+
+def get_current_user_id(request, require_token=True):
+    """Retorna el user_id autenticado por el tween, o la respuesta de error"""
+    if request.auth_error:
+        return None, json_response({'error': request.auth_error}, status=400)
+
+    if request.jwt_payload is None:
+        if require_token:
+            return None, json_response({'error': 'Token requerido'}, status=401)
+        return None, None
+
+    return request.user_id, None
@@ -0,0 +1,22 @@
+import time
+from app.metrics import metrics, begin_request, end_request
+
+
+def metrics_tween_factory(handler, registry):
+    """Record latency, status and DB usage for every request by route name"""
+
+    def metrics_tween(request):
+        stats = begin_request()
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = handler(request)
+            status = response.status_code
+            return response
+        finally:
+            route = getattr(request, 'matched_route', None)
+            stats.route_name = route.name if route is not None else '__unmatched__'
+            metrics.observe_request(stats.route_name, status, time.perf_counter() - start, stats)
+            end_request()
+
+    return metrics_tween
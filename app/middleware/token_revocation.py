@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from app.database import SessionFactory
+from app.models.revoked_token import RevokedToken
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+SYNC_INTERVAL = float(os.getenv('REVOCATION_SYNC_INTERVAL', 10))
+# Margin applied to the sync watermark so rows committed slightly out of
+# order (or by a worker with a skewed clock) are not missed.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class RevocationList:
+    """In-memory jti -> exp map of revoked tokens, synced from revoked_tokens.
+
+    Lookups are a dict access; the database is only queried once every
+    SYNC_INTERVAL seconds per process, by whichever request gets there first.
+    """
+
+    def __init__(self, sync_interval=SYNC_INTERVAL):
+        self.sync_interval = sync_interval
+        self._revoked = {}
+        self._sync_lock = threading.Lock()
+        self._last_sync = None
+        self._watermark = None
+
+    def is_revoked(self, jti) -> bool:
+        """Check whether a token id has been revoked"""
+        if not jti:
+            return False
+        self._maybe_sync()
+        exp = self._revoked.get(jti)
+        if exp is None:
+            return False
+        if exp <= time.time():
+            self._revoked.pop(jti, None)
+            return False
+        return True
+
+    def add(self, jti, exp):
+        """Mark a token id as revoked in this process until its exp"""
+        self._revoked[jti] = exp
+
+    def revoke(self, db, payload) -> bool:
+        """Persist the revocation of a decoded token and apply it locally"""
+        jti = payload.get('jti')
+        exp = payload.get('exp')
+        if not jti or exp is None:
+            return False
+
+        db.merge(RevokedToken(
+            jti=jti,
+            user_id=payload.get('user_id'),
+            expires_at=datetime.utcfromtimestamp(exp),
+            revoked_at=datetime.utcnow()
+        ))
+        db.commit()
+        self.add(jti, exp)
+        return True
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if self._last_sync is not None and now - self._last_sync < self.sync_interval:
+            return
+        # Only one thread syncs; the rest keep serving from the current map
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self.sync()
+        except Exception:
+            log.exception("Could not sync revoked tokens, keeping the current list")
+        finally:
+            self._last_sync = time.monotonic()
+            self._sync_lock.release()
+
+    def sync(self):
+        """Load revocations committed since the last sync and drop expired ones"""
+        utcnow = datetime.utcnow()
+        db = SessionFactory()
+        try:
+            query = db.query(
+                RevokedToken.jti,
+                RevokedToken.expires_at,
+                RevokedToken.revoked_at
+            ).filter(RevokedToken.expires_at > utcnow)
+            if self._watermark is not None:
+                query = query.filter(RevokedToken.revoked_at >= self._watermark - SYNC_OVERLAP)
+            rows = query.all()
+        finally:
+            db.close()
+
+        for jti, expires_at, revoked_at in rows:
+            self._revoked[jti] = (expires_at - datetime(1970, 1, 1)).total_seconds()
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+        if self._watermark is None:
+            self._watermark = utcnow
+
+        now = time.time()
+        for jti, exp in list(self._revoked.items()):
+            if exp <= now:
+                self._revoked.pop(jti, None)
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,41 @@
+# app/models/job.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from app.database import Base
+from datetime import datetime
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Cola: WHERE status = 'queued' AND run_at <= now() ORDER BY run_at, id
+        Index('ix_jobs_queued_run_at', 'run_at', 'id', postgresql_where=text("status = 'queued'")),
+        # Jobs de workers caídos: WHERE status = 'running' AND locked_at < ?
+        Index('ix_jobs_running_locked_at', 'locked_at', postgresql_where=text("status = 'running'")),
+        # Limpieza: WHERE status IN ('succeeded', 'failed') AND finished_at < ?
+        Index('ix_jobs_finished_at', 'finished_at',
+              postgresql_where=text("status IN ('succeeded', 'failed')")),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(100), nullable=False)
+    payload = Column(JSONB, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=True, index=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)   # próximo intento
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime)
+
+    progress = Column(Integer, nullable=False, default=0)   # 0-100
+    progress_message = Column(String(255))
+    result = Column(JSONB)
+    error = Column(Text)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status}>"
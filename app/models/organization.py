@@ -6,7 +6,8 @@ from sqlalchemy import (
     ForeignKey,
     Table,
     Text,
-    Boolean
+    Boolean,
+    Index
 )
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -30,7 +31,9 @@ org_employee_roles = Table(
         Integer,
         ForeignKey('organization_roles.id', ondelete='CASCADE'),
         primary_key=True
-    )
+    ),
+    # La PK (employee_id, org_role_id) no sirve para buscar por rol (cascada al borrar un rol)
+    Index('ix_org_employee_roles_org_role_id', 'org_role_id')
 )
 
 # ==========================
@@ -38,6 +41,9 @@ org_employee_roles = Table(
 # ==========================
 class OrganizationRole(Base):
     __tablename__ = "organization_roles"
+    __table_args__ = (
+        Index('ix_organization_roles_org_id', 'org_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     org_id = Column(
@@ -65,6 +71,12 @@ class OrganizationRole(Base):
 # ==========================
 class OrganizationEmployee(Base):
     __tablename__ = "organization_employees"
+    __table_args__ = (
+        # Empleados de una organización y verificación de duplicados (org_id, user_id)
+        Index('ix_organization_employees_org_id_user_id', 'org_id', 'user_id'),
+        # Organizaciones donde un usuario es empleado (list_org)
+        Index('ix_organization_employees_user_id', 'user_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     org_id = Column(
@@ -103,6 +115,9 @@ class OrganizationEmployee(Base):
 # ==========================
 class Organization(Base):
     __tablename__ = "organizations"
+    __table_args__ = (
+        Index('ix_organizations_owner_id', 'owner_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -143,6 +158,11 @@ class Organization(Base):
         onupdate=datetime.utcnow
     )
 
+    # Concurrencia optimista: cada UPDATE/DELETE exige la versión leída (ETag / If-Match)
+    version = Column(Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+
     # Relationships
     owner = relationship(
         "User",
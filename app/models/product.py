@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Numeric, event
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Numeric, Index, event
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -7,9 +7,13 @@ import uuid
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Productos (activos) de una organización; también cubre WHERE org_id = ?
+        Index('ix_products_org_id_is_active', 'org_id', 'is_active'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    org_id = Column(Integer, ForeignKey('organizations.id', ondelete='CASCADE'), nullable=False, index=True)
+    org_id = Column(Integer, ForeignKey('organizations.id', ondelete='CASCADE'), nullable=False)
     name = Column(String(255), nullable=False)
     description = Column(Text)
     sku = Column(String(100), unique=True, nullable=False, index=True)
@@ -21,6 +25,10 @@ class Product(Base):
     attributes = Column(JSONB, default=dict)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Concurrencia optimista: cada UPDATE/DELETE exige la versión leída (ETag / If-Match)
+    version = Column(Integer, nullable=False, server_default='1')
+    
+    __mapper_args__ = {'version_id_col': version}
     
     # Relationships
     organization = relationship("Organization", back_populates="products")
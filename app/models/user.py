@@ -1,11 +1,22 @@
 # app/models/user.py
-from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Listado paginado: WHERE is_active = ? AND id > ? ORDER BY id
+        Index('ix_users_is_active_id', 'is_active', 'id'),
+        # Búsqueda por prefijo/similitud (requiere la extensión pg_trgm)
+        Index('ix_users_first_name_trgm', 'first_name',
+              postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'}),
+        Index('ix_users_last_name_trgm', 'last_name',
+              postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'}),
+        Index('ix_users_identity_number_trgm', 'identity_number',
+              postgresql_using='gin', postgresql_ops={'identity_number': 'gin_trgm_ops'}),
+    )
 
     id = Column(Integer, primary_key=True)
     first_name = Column(String(100), nullable=False)
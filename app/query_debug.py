@@ -0,0 +1,137 @@
+import os
+import logging
+import traceback
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from pyramid.threadlocal import get_current_request
+from app.database import env_flag
+from app.metrics import current_request_stats, begin_request, end_request
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+# Opt-in: development and test runs only, never in production
+QUERY_DEBUG = env_flag('QUERY_DEBUG', False)
+# Raise QueryBudgetExceeded instead of logging a warning
+QUERY_DEBUG_STRICT = env_flag('QUERY_DEBUG_STRICT', False)
+# Same SQL with this many different parameter sets in one request = N+1
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', 3))
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = (os.path.join(APP_DIR, 'query_debug.py'), os.path.join(APP_DIR, 'metrics.py'))
+
+
+class QueryBudgetExceeded(Exception):
+    """A route ran more SQL statements than its declared budget"""
+
+
+def _parse_budgets(value):
+    """Parse QUERY_BUDGETS="list_users=3,get_org=5" into a dict"""
+    budgets = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            route, limit = item.split('=', 1)
+            budgets[route.strip()] = int(limit)
+    return budgets
+
+query_budgets = _parse_budgets(os.getenv('QUERY_BUDGETS'))
+
+def set_query_budget(route_name, limit):
+    """Declare the maximum number of statements a route may run"""
+    query_budgets[route_name] = limit
+
+
+def _app_stack():
+    """Stack frames inside the app package, innermost last"""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(APP_DIR) and frame.filename not in _SKIP_FILES
+    ]
+    return ''.join(traceback.format_list(frames))
+
+
+def _route_name():
+    request = get_current_request()
+    route = getattr(request, 'matched_route', None)
+    return route.name if route is not None else None
+
+
+def _on_orm_execute(orm_execute_state):
+    stats = current_request_stats()
+    if stats is not None and orm_execute_state.is_relationship_load:
+        stats.relationship = str(orm_execute_state.loader_strategy_path[-1])
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request_stats()
+    if stats is None:
+        return
+    relationship, stats.relationship = stats.relationship, None
+    if stats.statements is None:
+        stats.statements = {}
+    # Only distinct parameter sets count: rerunning the same query is not N+1
+    parameter_sets = stats.statements.setdefault(statement, set())
+    before = len(parameter_sets)
+    parameter_sets.add(repr(parameters))
+    count = len(parameter_sets)
+    if count == QUERY_REPEAT_THRESHOLD and count > before:
+        log.warning(
+            "Possible N+1 in route %s: statement run with %d different parameter sets%s\n"
+            "%s\nApp stack:\n%s",
+            _route_name(), count,
+            f" (lazy load of {relationship})" if relationship else '',
+            statement, _app_stack()
+        )
+
+
+def instrument_engine(engine):
+    """Track repeated statements on this engine (no-op unless QUERY_DEBUG)"""
+    if not QUERY_DEBUG:
+        return
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    if not event.contains(Session, 'do_orm_execute', _on_orm_execute):
+        event.listen(Session, 'do_orm_execute', _on_orm_execute)
+
+
+def check_query_budget(route_name, queries):
+    """Warn, or raise in strict mode, when a route goes over its budget"""
+    limit = query_budgets.get(route_name)
+    if limit is None or queries <= limit:
+        return
+    message = f"Route {route_name} ran {queries} SQL statements (budget {limit})"
+    if QUERY_DEBUG_STRICT:
+        raise QueryBudgetExceeded(message)
+    log.warning(message)
+
+
+@contextmanager
+def count_queries():
+    """Count statements run outside a request (scripts, tests).
+
+        with count_queries() as stats:
+            ...
+        assert stats.queries <= 2
+    """
+    stats = begin_request()
+    try:
+        yield stats
+    finally:
+        end_request()
+
+
+def query_debug_tween_factory(handler, registry):
+    """Check each route's statement count against its query budget"""
+
+    def query_debug_tween(request):
+        response = handler(request)
+        stats = current_request_stats()
+        if stats is not None:
+            route = getattr(request, 'matched_route', None)
+            if route is not None:
+                check_query_budget(route.name, stats.queries)
+        return response
+
+    return query_debug_tween
@@ -0,0 +1,57 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from pyramid.response import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+def _default(obj):
+    """Encode the types our views return that JSON has no native form for"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(value) -> bytes:
+        """Serialize to UTF-8 JSON bytes (orjson; datetime/date handled natively)"""
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+    def dumps(value) -> bytes:
+        """Serialize to UTF-8 JSON bytes (stdlib fallback)"""
+        return _encoder.encode(value).encode('utf-8')
+
+
+class JSONRenderer:
+    """Pyramid 'json' renderer backed by dumps()"""
+
+    def __init__(self, info):
+        pass
+
+    def __call__(self, value, system):
+        request = system.get('request')
+        if request is not None:
+            response = request.response
+            if response.content_type == response.default_content_type:
+                response.content_type = 'application/json'
+        return dumps(value)
+
+
+def json_response(data, status=200):
+    """Crea una respuesta JSON correctamente formateada"""
+    return Response(
+        body=dumps(data),
+        status=status,
+        content_type='application/json',
+        charset='utf-8'
+    )
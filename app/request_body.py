@@ -0,0 +1,146 @@
+import os
+import json
+import codecs
+from dotenv import load_dotenv
+from app.renderers import json_response
+
+load_dotenv()
+
+# Default limit for every view; routes can raise it with view_config(max_body_size=...)
+MAX_BODY_SIZE = int(os.getenv('MAX_BODY_SIZE', 1024 * 1024))
+BULK_MAX_BODY_SIZE = int(os.getenv('BULK_MAX_BODY_SIZE', 16 * 1024 * 1024))
+# Hard cap enforced by waitress before the app sees the request
+MAX_REQUEST_BODY_SIZE = max(MAX_BODY_SIZE, BULK_MAX_BODY_SIZE)
+
+JSON_STREAM_CHUNK = 64 * 1024
+WHITESPACE = ' \t\r\n'
+NUMBER_CONTINUATION = '.eE+-0123456789'
+
+_decoder = json.JSONDecoder()
+
+
+class RequestBodyTooLarge(Exception):
+    """The body exceeded the route's limit while it was being read"""
+
+
+class JSONStreamError(ValueError):
+    """The body is not a well-formed JSON array"""
+
+
+def body_too_large_response(limit):
+    return json_response(
+        {'error': f'El cuerpo de la solicitud supera el máximo de {limit} bytes'},
+        status=413
+    )
+
+
+def body_size_limit(view, info):
+    """View deriver: reject bodies over the route's max_body_size with 413.
+
+    Content-Length is checked before the view runs, so an oversized body is
+    never read; iter_json_array() enforces the same limit on bodies without one.
+    """
+    limit = info.options.get('max_body_size', MAX_BODY_SIZE)
+
+    def wrapper(context, request):
+        if request.content_length is not None and request.content_length > limit:
+            return body_too_large_response(limit)
+        request.max_body_size = limit
+        return view(context, request)
+
+    return wrapper
+
+body_size_limit.options = ('max_body_size',)
+
+
+class JSONArrayReader:
+    """Incremental decoder for a top-level JSON array.
+
+    Only the text not yet consumed is kept in memory, so a large bulk body
+    is never held as one string nor decoded into one list at once.
+    """
+
+    def __init__(self, stream, max_bytes=None, chunk_size=JSON_STREAM_CHUNK):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buffer = ''
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        """Append the next chunk to the buffer; False once the stream is exhausted"""
+        if self.eof:
+            return False
+        data = self.stream.read(size or self.chunk_size)
+        if data:
+            self.bytes_read += len(data)
+            if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+                raise RequestBodyTooLarge(self.max_bytes)
+            text = self.utf8.decode(data)
+        else:
+            self.eof = True
+            text = self.utf8.decode(b'', final=True)
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def _next_char(self):
+        """Skip whitespace and return the next character ('' at end of input)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _value(self):
+        self._next_char()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # Possibly cut at the chunk boundary: read more (doubling) and retry
+                if not self._fill(max(self.chunk_size, len(self.buffer) - self.pos)):
+                    raise JSONStreamError(str(e)) from None
+                continue
+            # A number cut at the chunk boundary may continue in the next chunk;
+            # raw_decode takes '1' from a buffer ending in '1.' or '1e-' as well
+            if (type(value) in (int, float) and not self.buffer[end:].strip(NUMBER_CONTINUATION)
+                    and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+    def _expect(self, expected):
+        char = self._next_char()
+        if not char or char not in expected:
+            found = repr(char) if char else 'fin del documento'
+            raise JSONStreamError(f'Se esperaba {" o ".join(repr(c) for c in expected)}, se encontró {found}')
+        self.pos += 1
+        return char
+
+    def __iter__(self):
+        self._expect('[')
+        if self._next_char() == ']':
+            self.pos += 1
+        else:
+            while True:
+                yield self._value()
+                if self._expect(',]') == ']':
+                    break
+        if self._next_char():
+            raise JSONStreamError('Contenido adicional después del arreglo')
+
+
+def iter_json_array(request, chunk_size=JSON_STREAM_CHUNK):
+    """Yield the items of the request's JSON array body as they are decoded.
+
+    Raises JSONStreamError for malformed input and RequestBodyTooLarge when
+    the body grows past the route's max_body_size.
+    """
+    limit = getattr(request, 'max_body_size', MAX_BODY_SIZE)
+    return iter(JSONArrayReader(request.body_file, max_bytes=limit, chunk_size=chunk_size))
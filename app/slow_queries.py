@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+try:
+    import fcntl
+except ImportError:  # Windows: no prefork workers, one process per directory
+    fcntl = None
+from sqlalchemy import event
+from pyramid.threadlocal import get_current_request
+from app.database import env_flag
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 500))  # 0 = desactivado
+# EXPLAIN (ANALYZE, BUFFERS) re-runs the query, so it is opt-in and SELECT only
+SLOW_QUERY_EXPLAIN = env_flag('SLOW_QUERY_EXPLAIN', False)
+SLOW_QUERY_DIR = os.getenv('SLOW_QUERY_DIR', 'var/slow_queries')
+SLOW_QUERY_SLOTS = int(os.getenv('SLOW_QUERY_SLOTS', 500))
+MAX_PENDING = 100
+
+
+def _route_name():
+    request = get_current_request()
+    route = getattr(request, 'matched_route', None)
+    return route.name if route is not None else None
+
+
+def _describe_value(value):
+    """Type (and length) of a bind parameter, e.g. 'str(24)'; never its value"""
+    name = type(value).__name__
+    try:
+        return f'{name}({len(value)})'
+    except TypeError:
+        return name
+
+
+def _printable_params(parameters):
+    """Parameter types and lengths only: values (emails, identity numbers,
+    names) must not end up on disk or in the admin API"""
+    if isinstance(parameters, dict):
+        return {str(key): _describe_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_describe_value(value) for value in parameters]
+    return _describe_value(parameters)
+
+
+def _is_select(statement):
+    return statement.lstrip().lower().startswith('select')
+
+
+class SlowQueryLog:
+    """Bounded on-disk ring buffer of slow statements.
+
+    Each entry is one JSON file in a fixed set of slots; once all slots are
+    used the oldest is overwritten. Recording happens on a worker thread so
+    the request only pays for a queue put. The next slot is kept in a file
+    under an exclusive lock, so prefork workers sharing the directory take
+    turns instead of overwriting each other's entries.
+    """
+
+    def __init__(self, directory=SLOW_QUERY_DIR, slots=SLOW_QUERY_SLOTS, explain=SLOW_QUERY_EXPLAIN):
+        self.directory = directory
+        self.slots = slots
+        self.explain = explain
+        self._queue = queue.Queue(maxsize=MAX_PENDING)
+        self._next_slot = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _slot_path(self, slot):
+        return os.path.join(self.directory, f'slot-{slot:05d}.json')
+
+    def _claim_slot(self):
+        """Reserve the next slot of the ring, shared by every process"""
+        if fcntl is None:
+            if self._next_slot is None:
+                self._next_slot = self._find_next_slot()
+            slot, self._next_slot = self._next_slot, (self._next_slot + 1) % self.slots
+            return slot
+        with open(os.path.join(self.directory, 'next_slot'), 'a+', encoding='ascii') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+            f.seek(0)
+            value = f.read().strip()
+            slot = int(value) % self.slots if value.isdigit() else self._find_next_slot()
+            f.seek(0)
+            f.truncate()
+            f.write(str((slot + 1) % self.slots))
+        return slot
+
+    def _find_next_slot(self):
+        """Continue after the most recently written slot"""
+        newest, newest_mtime = -1, None
+        for slot in range(self.slots):
+            try:
+                mtime = os.path.getmtime(self._slot_path(slot))
+            except OSError:
+                continue
+            if newest_mtime is None or mtime > newest_mtime:
+                newest, newest_mtime = slot, mtime
+        return (newest + 1) % self.slots
+
+    def submit(self, engine, statement, parameters, duration, route):
+        """Queue a slow statement; dropped if the worker is behind"""
+        self.start()
+        try:
+            self._queue.put_nowait((engine, statement, parameters, duration, route, time.time()))
+        except queue.Full:
+            log.debug("Slow query log queue full, dropping entry")
+
+    def is_worker_thread(self):
+        """True for the EXPLAIN statements the worker itself runs"""
+        return threading.current_thread() is self._thread
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='slow-query-log', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._record(*item)
+            except Exception:
+                log.exception("Failed to record slow query")
+
+    def _explain(self, engine, statement, parameters):
+        with engine.connect() as conn:
+            trans = conn.begin()
+            try:
+                rows = conn.exec_driver_sql('EXPLAIN (ANALYZE, BUFFERS) ' + statement, parameters)
+                return '\n'.join(row[0] for row in rows)
+            finally:
+                # ANALYZE executes the statement; never keep any side effect
+                trans.rollback()
+
+    def _record(self, engine, statement, parameters, duration, route, at):
+        entry = {
+            'route': route,
+            'duration_ms': round(duration * 1000, 3),
+            'sql': statement,
+            'params': _printable_params(parameters),
+            'recorded_at': datetime.fromtimestamp(at, timezone.utc).isoformat(),
+            'explain': None,
+        }
+        if self.explain and _is_select(statement):
+            try:
+                entry['explain'] = self._explain(engine, statement, parameters)
+            except Exception as e:
+                entry['explain'] = f'EXPLAIN failed: {e}'
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._slot_path(self._claim_slot())
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def entries(self):
+        """All recorded entries currently in the buffer"""
+        result = []
+        for slot in range(self.slots):
+            try:
+                with open(self._slot_path(slot), encoding='utf-8') as f:
+                    result.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return result
+
+    def worst(self, limit=20, group=False):
+        """Slowest entries, or statements grouped by SQL ordered by total time"""
+        entries = self.entries()
+        if not group:
+            entries.sort(key=lambda entry: entry['duration_ms'], reverse=True)
+            return entries[:limit]
+
+        groups = {}
+        for entry in entries:
+            g = groups.get(entry['sql'])
+            if g is None:
+                g = groups[entry['sql']] = {
+                    'sql': entry['sql'], 'routes': set(), 'count': 0,
+                    'total_ms': 0.0, 'max_ms': 0.0, 'explain': None,
+                }
+            g['count'] += 1
+            g['total_ms'] += entry['duration_ms']
+            g['routes'].add(entry['route'])
+            if entry['duration_ms'] >= g['max_ms']:
+                g['max_ms'] = entry['duration_ms']
+                g['explain'] = entry['explain'] or g['explain']
+        for g in groups.values():
+            g['avg_ms'] = round(g['total_ms'] / g['count'], 3)
+            g['total_ms'] = round(g['total_ms'], 3)
+            g['routes'] = sorted(r for r in g['routes'] if r)
+        return sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)[:limit]
+
+
+slow_query_log = SlowQueryLog()
+
+
+def instrument_engine(engine):
+    """Send statements slower than SLOW_QUERY_MS to the slow query log"""
+    if SLOW_QUERY_MS <= 0:
+        return
+    threshold = SLOW_QUERY_MS / 1000
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._slow_query_start
+        if duration < threshold or executemany or slow_query_log.is_worker_thread():
+            return
+        slow_query_log.submit(engine, statement, parameters, duration, _route_name())
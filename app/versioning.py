@@ -0,0 +1,43 @@
+from app.renderers import json_response
+
+
+def version_etag(version):
+    """ETag for a row version (the version column of version_id_col models)"""
+    return f'"{version}"'
+
+
+def _if_match_tags(header):
+    for tag in header.split(','):
+        tag = tag.strip()
+        # Compressed responses carry a weak ETag (W/"n"); it names the same version
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        yield tag
+
+
+def precondition_failed(version=None):
+    response = json_response(
+        {'error': 'El recurso fue modificado por otra solicitud; vuelva a obtenerlo'},
+        status=412
+    )
+    if version is not None:
+        response.headers['ETag'] = version_etag(version)
+    return response
+
+
+def check_if_match(request, version):
+    """Return None if If-Match names the current version, else the 428/412 response.
+
+    The check here gives an early answer; the real guarantee is the
+    UPDATE ... WHERE version = ? that version_id_col issues on flush, which
+    raises StaleDataError when another request committed in between.
+    """
+    header = request.headers.get('If-Match')
+    if not header:
+        return json_response(
+            {'error': 'Se requiere el encabezado If-Match con el ETag del recurso'},
+            status=428
+        )
+    if header.strip() == '*' or version_etag(version) in _if_match_tags(header):
+        return None
+    return precondition_failed(version)
@@ -0,0 +1,30 @@
+# app/views/admin_views.py
+import os
+from pyramid.view import view_config
+from app.renderers import json_response
+from app.middleware.jwt_middleware import get_current_user_id
+from app.slow_queries import slow_query_log
+
+# Usuarios con acceso a los endpoints de administración
+ADMIN_USER_IDS = {int(i) for i in os.getenv('ADMIN_USER_IDS', '').split(',') if i.strip()}
+
+@view_config(route_name='list_slow_queries', renderer='json')
+def list_slow_queries(request):
+    """
+    Consultas lentas registradas (más lentas primero).
+    Con ?group=true agrupa por sentencia SQL y ordena por tiempo total.
+    """
+    user_id, error = get_current_user_id(request)
+    if error:
+        return error
+    if user_id not in ADMIN_USER_IDS:
+        return json_response({'error': 'No tienes permiso para ver esta información'}, status=403)
+    
+    try:
+        limit = min(max(int(request.params.get('limit', 20)), 1), 200)
+    except ValueError:
+        return json_response({'error': 'limit debe ser un entero'}, status=400)
+    group = request.params.get('group', 'false').lower() == 'true'
+    
+    slow_queries = slow_query_log.worst(limit=limit, group=group)
+    return {'slow_queries': slow_queries, 'count': len(slow_queries)}
@@ -0,0 +1,31 @@
+# app/views/catalog_views.py
+from pyramid.view import view_config
+from pyramid.response import Response
+from app.catalog_cache import catalog_cache
+from app.renderers import json_response
+
+@view_config(route_name='list_catalogs')
+def list_catalogs(request):
+    """
+    Devuelve países, géneros y tipos de identidad activos en una sola respuesta.
+    El cuerpo viene pre-serializado desde la caché y soporta GET condicional
+    (If-None-Match -> 304) sin acceder a la base de datos.
+    """
+    try:
+        catalogs = catalog_cache.get()
+    except Exception as e:
+        return json_response({'error': str(e)}, status=500)
+    
+    if catalogs.etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(
+            body=catalogs.bootstrap_body,
+            content_type='application/json',
+            charset='utf-8'
+        )
+    
+    response.etag = catalogs.etag
+    # El cliente puede guardar la respuesta pero debe revalidarla siempre
+    response.cache_control = 'no-cache'
+    return response
@@ -1,24 +1,9 @@
 # app/views/country_views.py
 from pyramid.view import view_config
-from pyramid.response import Response
-import json
-from app.database import SessionLocal
+from app.renderers import json_response
+from app.catalog_cache import catalog_cache
 from app.models.country import Country
-from app.middleware.jwt_middleware import extract_token, verify_token
-
-def get_current_user_id(request, require_token=True):
-    """Extrae y valida el token, retorna el user_id"""
-    token = extract_token(request)
-    if not token:
-        if require_token:
-            return None, Response(json.dumps({'error': 'Token requerido'}), status=401)
-        return None, None
-    
-    try:
-        payload = verify_token(token)
-        return payload.get('user_id'), None
-    except Exception as e:
-        return None, Response(json.dumps({'error': str(e)}), status=400)
+from app.middleware.jwt_middleware import get_current_user_id
 
 def format_country(country):
     """Convierte un país a diccionario formateado"""
@@ -34,15 +19,8 @@ def format_country(country):
 def list_countries(request):
     """Lista todos los países activos - devuelve array directo"""
     try:
-        db = SessionLocal()
-        # Filtrar activos (True o NULL se considera activo)
-        countries = db.query(Country)\
-            .filter((Country.is_active == True) | (Country.is_active == None))\
-            .all()
-        db.close()
-
-        # Devuelve directamente el array
-        return [format_country(c) for c in countries]
+        # Servido desde la caché de catálogos (sin consulta a la base)
+        return list(catalog_cache.get().active_countries)
 
     except Exception as e:
         request.response.status = 500
@@ -57,21 +35,19 @@ def create_country(request):
     
     try:
         data = request.json_body
-        db = SessionLocal()
+        db = request.dbsession
         
         # Validar campos requeridos
         if not data.get('code') or not data.get('name') or not data.get('phone_code'):
-            db.close()
-            return Response(
-                json.dumps({'error': 'Los campos code, name y phone_code son requeridos'}),
+            return json_response(
+                {'error': 'Los campos code, name y phone_code son requeridos'},
                 status=400
             )
         
         # Validar que no exista
         if db.query(Country).filter(Country.code == data['code']).first():
-            db.close()
-            return Response(
-                json.dumps({'error': 'Ya existe un país con este código'}),
+            return json_response(
+                {'error': 'Ya existe un país con este código'},
                 status=400
             )
         
@@ -83,35 +59,32 @@ def create_country(request):
         )
         
         db.add(new_country)
+        catalog_cache.invalidate(db)
         db.commit()
         db.refresh(new_country)
-        db.close()
         
         return {
             'message': 'País creado exitosamente',
             'data': format_country(new_country)
         }
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='get_country', renderer='json')
 def get_country(request):
     """Obtener un país por ID"""
     try:
         country_id = int(request.matchdict['id'])
-        db = SessionLocal()
-        
-        country = db.query(Country).filter(Country.id == country_id).first()
-        db.close()
+        country = catalog_cache.get().countries_by_id.get(country_id)
         
         if not country:
-            return Response(json.dumps({'error': 'País no encontrado'}), status=404)
+            return json_response({'error': 'País no encontrado'}, status=404)
         
-        return format_country(country)
+        return country
     except ValueError:
-        return Response(json.dumps({'error': 'ID inválido'}), status=400)
+        return json_response({'error': 'ID inválido'}, status=400)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='update_country', renderer='json')
 def update_country(request):
@@ -123,12 +96,11 @@ def update_country(request):
     try:
         country_id = int(request.matchdict['id'])
         data = request.json_body
-        db = SessionLocal()
+        db = request.dbsession
         
         country = db.query(Country).filter(Country.id == country_id).first()
         if not country:
-            db.close()
-            return Response(json.dumps({'error': 'País no encontrado'}), status=404)
+            return json_response({'error': 'País no encontrado'}, status=404)
         
         # Actualizar campos
         if 'name' in data:
@@ -138,17 +110,17 @@ def update_country(request):
         if 'is_active' in data:
             country.is_active = data['is_active']
         
+        catalog_cache.invalidate(db)
         db.commit()
-        db.close()
         
         return {
             'message': 'País actualizado exitosamente',
             'data': format_country(country)
         }
     except ValueError:
-        return Response(json.dumps({'error': 'ID inválido'}), status=400)
+        return json_response({'error': 'ID inválido'}, status=400)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='delete_country', renderer='json')
 def delete_country(request):
@@ -159,20 +131,19 @@ def delete_country(request):
     
     try:
         country_id = int(request.matchdict['id'])
-        db = SessionLocal()
+        db = request.dbsession
         
         country = db.query(Country).filter(Country.id == country_id).first()
         if not country:
-            db.close()
-            return Response(json.dumps({'error': 'País no encontrado'}), status=404)
+            return json_response({'error': 'País no encontrado'}, status=404)
         
         # Soft delete
         country.is_active = False
+        catalog_cache.invalidate(db)
         db.commit()
-        db.close()
         
         return {'message': 'País eliminado exitosamente'}
     except ValueError:
-        return Response(json.dumps({'error': 'ID inválido'}), status=400)
+        return json_response({'error': 'ID inválido'}, status=400)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
\ No newline at end of file
+        return json_response({'error': str(e)}, status=500)
\ No newline at end of file
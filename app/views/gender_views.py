@@ -1,24 +1,9 @@
 # app/views/gender_views.py
 from pyramid.view import view_config
-from pyramid.response import Response
-import json
-from app.database import SessionLocal
+from app.renderers import json_response
+from app.catalog_cache import catalog_cache
 from app.models.gender import Gender
-from app.middleware.jwt_middleware import extract_token, verify_token
-
-def get_current_user_id(request, require_token=True):
-    """Extrae y valida el token, retorna el user_id"""
-    token = extract_token(request)
-    if not token:
-        if require_token:
-            return None, Response(json.dumps({'error': 'Token requerido'}), status=401)
-        return None, None
-    
-    try:
-        payload = verify_token(token)
-        return payload.get('user_id'), None
-    except Exception as e:
-        return None, Response(json.dumps({'error': str(e)}), status=400)
+from app.middleware.jwt_middleware import get_current_user_id
 
 def format_gender(gender):
     """Convierte un género a diccionario formateado"""
@@ -33,14 +18,8 @@ def format_gender(gender):
 def list_genders(request):
     """Lista todos los géneros - devuelve array directo"""
     try:
-        db = SessionLocal()
-        genders = db.query(Gender)\
-            .filter(Gender.is_active == True)\
-            .all()
-        db.close()
-
-        # Devuelve directamente el array
-        return [format_gender(g) for g in genders]
+        # Servido desde la caché de catálogos (sin consulta a la base)
+        return list(catalog_cache.get().active_genders)
 
     except Exception as e:
         request.response.status = 500
@@ -55,21 +34,19 @@ def create_gender(request):
     
     try:
         data = request.json_body
-        db = SessionLocal()
+        db = request.dbsession
         
         # Validar campos requeridos
         if not data.get('code') or not data.get('name'):
-            db.close()
-            return Response(
-                json.dumps({'error': 'Los campos code y name son requeridos'}),
+            return json_response(
+                {'error': 'Los campos code y name son requeridos'},
                 status=400
             )
         
         # Validar que no exista
         if db.query(Gender).filter(Gender.code == data['code']).first():
-            db.close()
-            return Response(
-                json.dumps({'error': 'Ya existe un género con este código'}),
+            return json_response(
+                {'error': 'Ya existe un género con este código'},
                 status=400
             )
         
@@ -80,35 +57,32 @@ def create_gender(request):
         )
         
         db.add(new_gender)
+        catalog_cache.invalidate(db)
         db.commit()
         db.refresh(new_gender)
-        db.close()
         
         return {
             'message': 'Género creado exitosamente',
             'data': format_gender(new_gender)
         }
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='get_gender', renderer='json')
 def get_gender(request):
     """Obtener un género por ID"""
     try:
         gender_id = int(request.matchdict['id'])
-        db = SessionLocal()
-        
-        gender = db.query(Gender).filter(Gender.id == gender_id).first()
-        db.close()
+        gender = catalog_cache.get().genders_by_id.get(gender_id)
         
         if not gender:
-            return Response(json.dumps({'error': 'Género no encontrado'}), status=404)
+            return json_response({'error': 'Género no encontrado'}, status=404)
         
-        return format_gender(gender)
+        return gender
     except ValueError:
-        return Response(json.dumps({'error': 'ID inválido'}), status=400)
+        return json_response({'error': 'ID inválido'}, status=400)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='update_gender', renderer='json')
 def update_gender(request):
@@ -120,12 +94,11 @@ def update_gender(request):
     try:
         gender_id = int(request.matchdict['id'])
         data = request.json_body
-        db = SessionLocal()
+        db = request.dbsession
         
         gender = db.query(Gender).filter(Gender.id == gender_id).first()
         if not gender:
-            db.close()
-            return Response(json.dumps({'error': 'Género no encontrado'}), status=404)
+            return json_response({'error': 'Género no encontrado'}, status=404)
         
         # Actualizar campos
         if 'name' in data:
@@ -133,17 +106,17 @@ def update_gender(request):
         if 'is_active' in data:
             gender.is_active = data['is_active']
         
+        catalog_cache.invalidate(db)
         db.commit()
-        db.close()
         
         return {
             'message': 'Género actualizado exitosamente',
             'data': format_gender(gender)
         }
     except ValueError:
-        return Response(json.dumps({'error': 'ID inválido'}), status=400)
+        return json_response({'error': 'ID inválido'}, status=400)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='delete_gender', renderer='json')
 def delete_gender(request):
@@ -154,20 +127,19 @@ def delete_gender(request):
     
     try:
         gender_id = int(request.matchdict['id'])
-        db = SessionLocal()
+        db = request.dbsession
         
         gender = db.query(Gender).filter(Gender.id == gender_id).first()
         if not gender:
-            db.close()
-            return Response(json.dumps({'error': 'Género no encontrado'}), status=404)
+            return json_response({'error': 'Género no encontrado'}, status=404)
         
         # Soft delete
         gender.is_active = False
+        catalog_cache.invalidate(db)
         db.commit()
-        db.close()
         
         return {'message': 'Género eliminado exitosamente'}
     except ValueError:
-        return Response(json.dumps({'error': 'ID inválido'}), status=400)
+        return json_response({'error': 'ID inválido'}, status=400)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
\ No newline at end of file
+        return json_response({'error': str(e)}, status=500)
\ No newline at end of file
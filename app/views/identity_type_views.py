@@ -1,24 +1,9 @@
 # app/views/identity_type_views.py
 from pyramid.view import view_config
-from pyramid.response import Response
-import json
-from app.database import SessionLocal
+from app.renderers import json_response
+from app.catalog_cache import catalog_cache
 from app.models.identity_type import IdentityType
-from app.middleware.jwt_middleware import extract_token, verify_token
-
-def get_current_user_id(request, require_token=True):
-    """Extrae y valida el token, retorna el user_id"""
-    token = extract_token(request)
-    if not token:
-        if require_token:
-            return None, Response(json.dumps({'error': 'Token requerido'}), status=401)
-        return None, None
-    
-    try:
-        payload = verify_token(token)
-        return payload.get('user_id'), None
-    except Exception as e:
-        return None, Response(json.dumps({'error': str(e)}), status=400)
+from app.middleware.jwt_middleware import get_current_user_id
 
 def format_identity_type(identity_type):
     """Convierte un tipo de identidad a diccionario formateado"""
@@ -33,14 +18,8 @@ def format_identity_type(identity_type):
 def list_identity_types(request):
     """Lista todos los tipos de identidad - devuelve array directo"""
     try:
-        db = SessionLocal()
-        identity_types = db.query(IdentityType)\
-            .filter(IdentityType.is_active == True)\
-            .all()
-        db.close()
-
-        # Devuelve directamente el array
-        return [format_identity_type(it) for it in identity_types]
+        # Servido desde la caché de catálogos (sin consulta a la base)
+        return list(catalog_cache.get().active_identity_types)
 
     except Exception as e:
         request.response.status = 500
@@ -55,21 +34,19 @@ def create_identity_type(request):
     
     try:
         data = request.json_body
-        db = SessionLocal()
+        db = request.dbsession
         
         # Validar campos requeridos
         if not data.get('code') or not data.get('name'):
-            db.close()
-            return Response(
-                json.dumps({'error': 'Los campos code y name son requeridos'}),
+            return json_response(
+                {'error': 'Los campos code y name son requeridos'},
                 status=400
             )
         
         # Validar que no exista
         if db.query(IdentityType).filter(IdentityType.code == data['code']).first():
-            db.close()
-            return Response(
-                json.dumps({'error': 'Ya existe un tipo de identidad con este código'}),
+            return json_response(
+                {'error': 'Ya existe un tipo de identidad con este código'},
                 status=400
             )
         
@@ -80,35 +57,32 @@ def create_identity_type(request):
         )
         
         db.add(new_identity_type)
+        catalog_cache.invalidate(db)
         db.commit()
         db.refresh(new_identity_type)
-        db.close()
         
         return {
             'message': 'Tipo de identidad creado exitosamente',
             'data': format_identity_type(new_identity_type)
         }
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='get_identity_type', renderer='json')
 def get_identity_type(request):
     """Obtener un tipo de identidad por ID"""
     try:
         identity_type_id = int(request.matchdict['id'])
-        db = SessionLocal()
-        
-        identity_type = db.query(IdentityType).filter(IdentityType.id == identity_type_id).first()
-        db.close()
+        identity_type = catalog_cache.get().identity_types_by_id.get(identity_type_id)
         
         if not identity_type:
-            return Response(json.dumps({'error': 'Tipo de identidad no encontrado'}), status=404)
+            return json_response({'error': 'Tipo de identidad no encontrado'}, status=404)
         
-        return format_identity_type(identity_type)
+        return identity_type
     except ValueError:
-        return Response(json.dumps({'error': 'ID inválido'}), status=400)
+        return json_response({'error': 'ID inválido'}, status=400)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='update_identity_type', renderer='json')
 def update_identity_type(request):
@@ -120,12 +94,11 @@ def update_identity_type(request):
     try:
         identity_type_id = int(request.matchdict['id'])
         data = request.json_body
-        db = SessionLocal()
+        db = request.dbsession
         
         identity_type = db.query(IdentityType).filter(IdentityType.id == identity_type_id).first()
         if not identity_type:
-            db.close()
-            return Response(json.dumps({'error': 'Tipo de identidad no encontrado'}), status=404)
+            return json_response({'error': 'Tipo de identidad no encontrado'}, status=404)
         
         # Actualizar campos
         if 'name' in data:
@@ -133,17 +106,17 @@ def update_identity_type(request):
         if 'is_active' in data:
             identity_type.is_active = data['is_active']
         
+        catalog_cache.invalidate(db)
         db.commit()
-        db.close()
         
         return {
             'message': 'Tipo de identidad actualizado exitosamente',
             'data': format_identity_type(identity_type)
         }
     except ValueError:
-        return Response(json.dumps({'error': 'ID inválido'}), status=400)
+        return json_response({'error': 'ID inválido'}, status=400)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='delete_identity_type', renderer='json')
 def delete_identity_type(request):
@@ -154,20 +127,19 @@ def delete_identity_type(request):
     
     try:
         identity_type_id = int(request.matchdict['id'])
-        db = SessionLocal()
+        db = request.dbsession
         
         identity_type = db.query(IdentityType).filter(IdentityType.id == identity_type_id).first()
         if not identity_type:
-            db.close()
-            return Response(json.dumps({'error': 'Tipo de identidad no encontrado'}), status=404)
+            return json_response({'error': 'Tipo de identidad no encontrado'}, status=404)
         
         # Soft delete
         identity_type.is_active = False
+        catalog_cache.invalidate(db)
         db.commit()
-        db.close()
         
         return {'message': 'Tipo de identidad eliminado exitosamente'}
     except ValueError:
-        return Response(json.dumps({'error': 'ID inválido'}), status=400)
+        return json_response({'error': 'ID inválido'}, status=400)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
\ No newline at end of file
+        return json_response({'error': str(e)}, status=500)
\ No newline at end of file
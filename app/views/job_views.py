@@ -0,0 +1,44 @@
+# app/views/job_views.py
+from pyramid.view import view_config
+from app.renderers import json_response
+from app.models.job import Job
+from app.jobs import format_job
+from app.middleware.jwt_middleware import get_current_user_id
+
+def accepted_job_response(request, job):
+    """Respuesta 202 para una operación encolada, con la URL de estado"""
+    status_url = request.route_path('get_job', job_id=job.id)
+    response = json_response({
+        'message': 'Operación encolada',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': status_url
+    }, status=202)
+    response.location = status_url
+    return response
+
+@view_config(route_name='get_job', renderer='json')
+def get_job(request):
+    """
+    Estado de un job en segundo plano (queued, running, succeeded, failed),
+    con su progreso y resultado. Solo lo puede consultar quien lo creó.
+    """
+    user_id, error = get_current_user_id(request)
+    if error:
+        return error
+    
+    try:
+        job_id = int(request.matchdict['job_id'])
+    except ValueError:
+        return json_response({'error': 'Job no encontrado'}, status=404)
+    
+    db = request.dbsession
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).first()
+    if not job:
+        return json_response({'error': 'Job no encontrado'}, status=404)
+    
+    response = request.response
+    if job.status in ('queued', 'running'):
+        # Sugerencia de intervalo de consulta para el cliente
+        response.headers['Retry-After'] = '2'
+    return format_job(job)
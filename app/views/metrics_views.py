@@ -0,0 +1,23 @@
+# app/views/metrics_views.py
+from pyramid.view import view_config
+from pyramid.response import Response
+from app.metrics import render_metrics
+from app.db_routing import replica_monitor
+
+@view_config(route_name='metrics')
+def metrics_view(request):
+    """
+    Métricas en formato de texto de Prometheus (latencia por ruta, consultas
+    SQL, tiempo en base de datos y pool). En modo prefork suman todos los
+    workers, sin importar cuál atiende el scrape.
+    """
+    body = render_metrics()
+    if replica_monitor is not None and replica_monitor.lag is not None:
+        body += (
+            '# HELP db_replica_lag_seconds Replication lag of the read replica\n'
+            '# TYPE db_replica_lag_seconds gauge\n'
+            f'db_replica_lag_seconds {replica_monitor.lag}\n'
+        )
+    response = Response(body=body.encode('utf-8'), charset='utf-8')
+    response.content_type = 'text/plain; version=0.0.4'
+    return response
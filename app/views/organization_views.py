@@ -1,34 +1,54 @@
 from pyramid.view import view_config
-from pyramid.response import Response
-import json
-from app.database import SessionLocal
+from app.renderers import json_response
 from app.models.user import User
 from app.models.account import Account
 from app.models.organization import Organization, OrganizationRole, OrganizationEmployee
-from app.middleware.jwt_middleware import extract_token, verify_token
+from app.middleware.jwt_middleware import get_current_user_id
+from app.models.product import Product
+from app.jobs import enqueue, job_handler
+from app.views.job_views import accepted_job_response
+from sqlalchemy import func
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
+from app.versioning import version_etag, check_if_match, precondition_failed
 
-# ==================== FUNCIONES AUXILIARES ====================
+ORG_DELETE_SYNC_LIMIT = 1000  # productos + empleados; por encima se elimina en un job
+ORG_DELETE_BATCH = 5000
 
-def json_response(data, status=200):
-    """Crea una respuesta JSON correctamente formateada"""
-    return Response(
-        json.dumps(data),
-        status=status,
-        content_type='application/json; charset=utf-8'
+# ==================== FUNCIONES AUXILIARES ====================
+def adjust_employee_count(db, org_id, delta):
+    """
+    Suma delta a employee_count en un solo UPDATE y avanza la versión
+    (el ETag cambia porque cambia la representación de la organización).
+    """
+    db.query(Organization).filter(Organization.id == org_id).update(
+        {
+            Organization.employee_count: func.greatest(func.coalesce(Organization.employee_count, 0) + delta, 0),
+            Organization.version: Organization.version + 1
+        },
+        synchronize_session=False
     )
 
-def get_current_user_id(request):
-    """Extrae y valida el token, retorna el user_id"""
-    token = extract_token(request)
-    if not token:
-        return None, json_response({'error': 'Token requerido'}, status=401)
-    
-    try:
-        payload = verify_token(token)
-        return payload.get('user_id'), None
-    except Exception as e:
-        return None, json_response({'error': str(e)}, status=400)
+def format_public_organization(org):
+    """Información pública de una organización (sin owner ni datos internos)"""
+    return {
+        'id': org.id,
+        'name': org.name,
+        'legal_name': org.legal_name,
+        'email': org.email,
+        'country_id': org.country_id,
+        'org_type': org.org_type,
+        'description': org.description,
+        'primary_color': org.primary_color,
+        'secondary_color': org.secondary_color,
+        'tertiary_color': org.tertiary_color,
+        'employee_count': org.employee_count,
+        'address': org.address,
+        'is_active': org.is_active,
+        'extra_data': org.extra_data,
+        'telephone': org.telephone,
+        'created_at': org.created_at
+    }
 
 # ==================== VISTAS DE ORGANIZACIÓN ====================
 @view_config(route_name='list_public_organizations', renderer='json', request_method='GET')
@@ -37,7 +57,7 @@ def list_public_organizations(request):
     Lista todas las organizaciones activas sin requerir autenticación.
     Retorna solo información pública de las organizaciones.
     """
-    db = SessionLocal()
+    db = request.dbsession
     try:
         organizations = (
             db.query(Organization)
@@ -47,44 +67,20 @@ def list_public_organizations(request):
         )
 
         return {
-            'organizations': [
-                {
-                    'id': org.id,
-                    'name': org.name,
-                    'legal_name': org.legal_name,
-                    'email': org.email,
-                    'country_id': org.country_id,
-                    'org_type': org.org_type,
-                    'description': org.description,
-                    'primary_color': org.primary_color,
-                    'secondary_color': org.secondary_color,
-                    'tertiary_color': org.tertiary_color,
-                    'employee_count': org.employee_count,
-                    'address': org.address,
-                    'is_active': org.is_active,
-                    'extra_data': org.extra_data,
-                    'telephone': org.telephone,
-                    'created_at': org.created_at.isoformat()
-                }
-                for org in organizations
-            ],
+            'organizations': [format_public_organization(org) for org in organizations],
             'count': len(organizations)
         }
 
     except Exception as e:
-        db.rollback()
         return json_response({'error': str(e)}, status=500)
 
-    finally:
-        db.close()
-
 @view_config(route_name='create_org', renderer='json')
 def create_org(request):
     user_id, error = get_current_user_id(request)
     if error:
         return error
 
-    db = SessionLocal()
+    db = request.dbsession
     try:
         data = request.json_body
 
@@ -128,16 +124,11 @@ def create_org(request):
         }
 
     except KeyError as e:
-        db.rollback()
         return json_response({'error': f'Campo requerido faltante: {str(e)}'}, status=400)
 
     except Exception as e:
-        db.rollback()
         return json_response({'error': str(e)}, status=500)
 
-    finally:
-        db.close()  
-
 # ==================== RUTAS PRIVADAS ====================
 @view_config(route_name='get_org', renderer='json')
 def get_org(request):
@@ -145,7 +136,7 @@ def get_org(request):
     if error:
         return error
 
-    db = SessionLocal()
+    db = request.dbsession
     try:
         org_id = request.matchdict.get('org_id')
 
@@ -153,6 +144,8 @@ def get_org(request):
         if not org:
             return json_response({'error': 'Organización no encontrada'}, status=404)
 
+        # El ETag es la versión: se envía en If-Match al actualizar
+        request.response.headers['ETag'] = version_etag(org.version)
         return {
             'id': org.id,
             'name': org.name,
@@ -170,32 +163,28 @@ def get_org(request):
             'address': org.address,
             'is_active': org.is_active,
             'extra_data': org.extra_data,
-            'created_at': org.created_at.isoformat()
+            'created_at': org.created_at,
+            'version': org.version
         }
 
     except Exception as e:
-        db.rollback()
         return json_response({'error': str(e)}, status=500)
 
-    finally:
-        db.close()
-
 @view_config(route_name='list_org', renderer='json')
 def list_org(request):
     user_id, error = get_current_user_id(request)
     if error:
         return error
 
-    db = SessionLocal()
+    db = request.dbsession
     try:
-        organizations = (
-            db.query(Organization)
-            .filter(
-                (Organization.owner_id == user_id) |
-                (Organization.employees.any(OrganizationEmployee.user_id == user_id))
-            )
-            .all()
+        # UNION en lugar de owner_id = ? OR EXISTS(...): cada rama usa su índice
+        # (ix_organizations_owner_id, ix_organization_employees_user_id)
+        org_ids = (
+            db.query(Organization.id).filter(Organization.owner_id == user_id)
+            .union(db.query(OrganizationEmployee.org_id).filter(OrganizationEmployee.user_id == user_id))
         )
+        organizations = db.query(Organization).filter(Organization.id.in_(org_ids)).all()
 
         return {
             'organizations': [
@@ -214,26 +203,22 @@ def list_org(request):
                     'employee_count': org.employee_count,
                     'is_active': org.is_active,
                     'extra_data': org.extra_data,
-                    'created_at': org.created_at.isoformat()
+                    'created_at': org.created_at
                 }
                 for org in organizations
             ]
         }
 
     except Exception as e:
-        db.rollback()  
         return json_response({'error': str(e)}, status=500)
 
-    finally:
-        db.close()     
-
 @view_config(route_name='update_org', renderer='json')
 def update_org(request):
     user_id, error = get_current_user_id(request)
     if error:
         return error
 
-    db = SessionLocal()
+    db = request.dbsession
     try:
         org_id = request.matchdict.get('org_id')
         data = request.json_body
@@ -245,6 +230,11 @@ def update_org(request):
         if org.owner_id != user_id:
             return json_response({'error': 'No tienes permiso para actualizar esta organización'}, status=403)
 
+        # Concurrencia optimista: If-Match con la versión leída (428 si falta, 412 si cambió)
+        error = check_if_match(request, org.version)
+        if error:
+            return error
+
         updatable_fields = [
             'name',
             'legal_name',
@@ -265,15 +255,15 @@ def update_org(request):
                 setattr(org, field, data[field])
 
         db.commit()
-        return {'message': 'Organización actualizada exitosamente'}
+        request.response.headers['ETag'] = version_etag(org.version)
+        return {'message': 'Organización actualizada exitosamente', 'version': org.version}
 
+    except StaleDataError:
+        # Otra solicitud confirmó un cambio entre la lectura y el UPDATE
+        return precondition_failed()
     except Exception as e:
-        db.rollback()
         return json_response({'error': str(e)}, status=500)
 
-    finally:
-        db.close()
-
 @view_config(route_name='delete_org', renderer='json')
 def delete_org(request):
     user_id, error = get_current_user_id(request)
@@ -282,25 +272,60 @@ def delete_org(request):
     
     try:
         org_id = request.matchdict.get('org_id')
-        db = SessionLocal()
+        db = request.dbsession
         
         org = db.query(Organization).filter(Organization.id == org_id).first()
         if not org:
-            db.close()
             return json_response({'error': 'Organización no encontrada'}, status=404)
         
         if org.owner_id != user_id:
-            db.close()
             return json_response({'error': 'No tienes permiso para eliminar esta organización'}, status=403)
         
+        # Organizaciones grandes: se desactivan ya y se eliminan por lotes en un job
+        size = (
+            db.query(func.count(Product.id)).filter(Product.org_id == org.id).scalar()
+            + (org.employee_count or 0)
+        )
+        if request.params.get('async') == 'true' or size > ORG_DELETE_SYNC_LIMIT:
+            org.is_active = False
+            job = enqueue(db, 'delete_organization', {'org_id': org.id}, user_id=user_id)
+            return accepted_job_response(request, job)
+        
         db.delete(org)
         db.commit()
-        db.close()
         
         return {'message': 'Organización eliminada exitosamente'}
+    except StaleDataError:
+        return precondition_failed()
     except Exception as e:
         return json_response({'error': str(e)}, status=500)
 
+@job_handler('delete_organization')
+def delete_organization_job(ctx):
+    """Elimina una organización grande por lotes, reportando el progreso"""
+    db = ctx.db
+    org_id = ctx.payload['org_id']
+    if db.query(Organization.id).filter(Organization.id == org_id).first() is None:
+        return {'deleted': False}
+    
+    # Productos y empleados primero, en transacciones cortas (los roles de empleado caen por CASCADE)
+    models = (Product, OrganizationEmployee, OrganizationRole)
+    total = sum(db.query(func.count(model.id)).filter(model.org_id == org_id).scalar() for model in models)
+    done = 0
+    for model in models:
+        while True:
+            ids = [row.id for row in db.query(model.id).filter(model.org_id == org_id).limit(ORG_DELETE_BATCH)]
+            if not ids:
+                break
+            db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            done += len(ids)
+            ctx.progress(99 * done // max(total, 1), f'{done} de {total} registros eliminados')
+    
+    db.query(Organization).filter(Organization.id == org_id).delete(synchronize_session=False)
+    db.commit()
+    return {'deleted': True, 'records': done}
+
 @view_config(route_name='add_employee', renderer='json')
 def add_employee(request):
     user_id, error = get_current_user_id(request)
@@ -311,21 +336,18 @@ def add_employee(request):
         org_id = request.matchdict.get('org_id')
         data = request.json_body
         
-        db = SessionLocal()
+        db = request.dbsession
         
         org = db.query(Organization).filter(Organization.id == org_id).first()
         if not org:
-            db.close()
             return json_response({'error': 'Organización no encontrada'}, status=404)
         
         if org.owner_id != user_id:
-            db.close()
             return json_response({'error': 'No tienes permiso para agregar empleados'}, status=403)
         
         new_user_id = data.get('user_id')
         user = db.query(User).filter(User.id == new_user_id).first()
         if not user:
-            db.close()
             return json_response({'error': 'Usuario no encontrado'}, status=404)
         
         # Verificar que el empleado no exista
@@ -333,7 +355,6 @@ def add_employee(request):
             OrganizationEmployee.org_id == org_id,
             OrganizationEmployee.user_id == new_user_id
         ).first():
-            db.close()
             return json_response({'error': 'El usuario ya es empleado de esta organización'}, status=400)
         
         new_employee = OrganizationEmployee(
@@ -341,11 +362,11 @@ def add_employee(request):
             user_id=new_user_id
         )
         
-        org.employee_count = (org.employee_count or 0) + 1
+        # Incremento atómico: no compite con otras altas ni con la edición de la organización
+        adjust_employee_count(db, org.id, 1)
         db.add(new_employee)
         db.commit()
         db.refresh(new_employee)
-        db.close()
         
         return {
             'message': 'Empleado agregado exitosamente',
@@ -366,15 +387,13 @@ def remove_employee(request):
         org_id = request.matchdict.get('org_id')
         employee_id = request.matchdict.get('employee_id')
         
-        db = SessionLocal()
+        db = request.dbsession
         
         org = db.query(Organization).filter(Organization.id == org_id).first()
         if not org:
-            db.close()
             return json_response({'error': 'Organización no encontrada'}, status=404)
         
         if org.owner_id != user_id:
-            db.close()
             return json_response({'error': 'No tienes permiso para remover empleados'}, status=403)
         
         employee = db.query(OrganizationEmployee).filter(
@@ -383,13 +402,11 @@ def remove_employee(request):
         ).first()
         
         if not employee:
-            db.close()
             return json_response({'error': 'Empleado no encontrado'}, status=404)
         
-        org.employee_count = max(0, (org.employee_count or 1) - 1)
+        adjust_employee_count(db, org.id, -1)
         db.delete(employee)
         db.commit()
-        db.close()
         
         return {'message': 'Empleado removido exitosamente'}
     except Exception as e:
@@ -402,41 +419,36 @@ def list_employees(request):
         return error
 
     org_id = int(request.matchdict['org_id'])
-    db = SessionLocal()
-
-    try:
-        org = db.query(Organization).filter(Organization.id == org_id).first()
-        if not org:
-            return json_response({'error': 'Organización no encontrada'}, status=404)
-
-        employees = (
-            db.query(OrganizationEmployee)
-            .options(
-                joinedload(OrganizationEmployee.user),
-                joinedload(OrganizationEmployee.roles)
-            )
-            .filter(
-                OrganizationEmployee.org_id == org_id,
-                OrganizationEmployee.is_active == True
-            )
-            .all()
+    db = request.dbsession
+    org = db.query(Organization).filter(Organization.id == org_id).first()
+    if not org:
+        return json_response({'error': 'Organización no encontrada'}, status=404)
+
+    employees = (
+        db.query(OrganizationEmployee)
+        .options(
+            joinedload(OrganizationEmployee.user),
+            joinedload(OrganizationEmployee.roles)
         )
+        .filter(
+            OrganizationEmployee.org_id == org_id,
+            OrganizationEmployee.is_active == True
+        )
+        .all()
+    )
 
-        return {
-            "employees": [
-                {
-                    "employee_id": e.id,
-                    "user_id": e.user.id if e.user else None,
-                    "first_name": e.user.first_name if e.user else None,
-                    "last_name": e.user.last_name if e.user else None,
-                    "roles": [r.name for r in e.roles]
-                }
-                for e in employees
-            ]
-        }
-
-    finally:
-        db.close()
+    return {
+        "employees": [
+            {
+                "employee_id": e.id,
+                "user_id": e.user.id if e.user else None,
+                "first_name": e.user.first_name if e.user else None,
+                "last_name": e.user.last_name if e.user else None,
+                "roles": [r.name for r in e.roles]
+            }
+            for e in employees
+        ]
+    }
 
 @view_config(route_name='create_org_role', request_method='POST', renderer='json')
 def create_org_role(request):
@@ -444,32 +456,29 @@ def create_org_role(request):
     if error:
         return error
 
-    db = SessionLocal()
-    try:
-        org_id = request.matchdict['org_id']
-        data = request.json_body
+    db = request.dbsession
+    org_id = request.matchdict['org_id']
+    data = request.json_body
 
-        org = db.query(Organization).filter(Organization.id == org_id).first()
-        if not org or org.owner_id != user_id:
-            return json_response({'error': 'No tienes permiso para crear roles'}, status=403)
+    org = db.query(Organization).filter(Organization.id == org_id).first()
+    if not org or org.owner_id != user_id:
+        return json_response({'error': 'No tienes permiso para crear roles'}, status=403)
 
-        role = OrganizationRole(
-            org_id=org_id,
-            name=data['name'],
-            description=data.get('description')
-        )
+    role = OrganizationRole(
+        org_id=org_id,
+        name=data['name'],
+        description=data.get('description')
+    )
 
-        db.add(role)
-        db.commit()
-        db.refresh(role)
+    db.add(role)
+    db.commit()
+    db.refresh(role)
 
-        return {
-            'id': role.id,
-            'name': role.name,
-            'description': role.description
-        }
-    finally:
-        db.close()
+    return {
+        'id': role.id,
+        'name': role.name,
+        'description': role.description
+    }
 
 
 @view_config(route_name='list_org_roles', renderer='json')
@@ -480,10 +489,9 @@ def list_org_roles(request):
     
     try:
         org_id = request.matchdict.get('org_id')
-        db = SessionLocal()
+        db = request.dbsession
         
         roles = db.query(OrganizationRole).filter(OrganizationRole.org_id == org_id).all()
-        db.close()
         
         return {
             'roles': [
@@ -491,7 +499,7 @@ def list_org_roles(request):
                     'id': role.id,
                     'name': role.name,
                     'description': role.description,
-                    'created_at': role.created_at.isoformat()
+                    'created_at': role.created_at
                 }
                 for role in roles
             ]
@@ -510,11 +518,10 @@ def assign_org_role(request):
         employee_id = request.matchdict.get('employee_id')
         role_id = request.matchdict.get('role_id')
         
-        db = SessionLocal()
+        db = request.dbsession
         
         org = db.query(Organization).filter(Organization.id == org_id).first()
         if not org or org.owner_id != user_id:
-            db.close()
             return json_response({'error': 'No tienes permiso para asignar roles'}, status=403)
         
         employee = db.query(OrganizationEmployee).filter(
@@ -523,7 +530,6 @@ def assign_org_role(request):
         ).first()
         
         if not employee:
-            db.close()
             return json_response({'error': 'Empleado no encontrado'}, status=404)
         
         role = db.query(OrganizationRole).filter(
@@ -532,16 +538,13 @@ def assign_org_role(request):
         ).first()
         
         if not role:
-            db.close()
             return json_response({'error': 'Rol no encontrado'}, status=404)
         
         if role in employee.roles:
-            db.close()
             return json_response({'error': 'El empleado ya tiene este rol'}, status=400)
         
         employee.roles.append(role)
         db.commit()
-        db.close()
         
         return {'message': 'Rol asignado exitosamente al empleado'}
     except Exception as e:
@@ -558,11 +561,10 @@ def remove_org_role(request):
         employee_id = request.matchdict.get('employee_id')
         role_id = request.matchdict.get('role_id')
         
-        db = SessionLocal()
+        db = request.dbsession
         
         org = db.query(Organization).filter(Organization.id == org_id).first()
         if not org or org.owner_id != user_id:
-            db.close()
             return json_response({'error': 'No tienes permiso para remover roles'}, status=403)
         
         employee = db.query(OrganizationEmployee).filter(
@@ -571,7 +573,6 @@ def remove_org_role(request):
         ).first()
         
         if not employee:
-            db.close()
             return json_response({'error': 'Empleado no encontrado'}, status=404)
         
         role = db.query(OrganizationRole).filter(
@@ -580,16 +581,13 @@ def remove_org_role(request):
         ).first()
         
         if not role:
-            db.close()
             return json_response({'error': 'Rol no encontrado'}, status=404)
         
         if role not in employee.roles:
-            db.close()
             return json_response({'error': 'El empleado no tiene este rol'}, status=400)
         
         employee.roles.remove(role)
         db.commit()
-        db.close()
         
         return {'message': 'Rol removido exitosamente del empleado'}
     except Exception as e:
@@ -1,27 +1,16 @@
 from pyramid.view import view_config
-from pyramid.response import Response
-import json
-from decimal import Decimal
-from app.database import SessionLocal
+from app.renderers import json_response
 from app.models.product import Product
 from app.models.organization import Organization
-from app.middleware.jwt_middleware import extract_token, verify_token
+from app.middleware.jwt_middleware import get_current_user_id
+from app.counting import product_count
+from app.versioning import version_etag, check_if_match, precondition_failed
+from sqlalchemy.orm.exc import StaleDataError
 
-# ==================== FUNCIONES AUXILIARES ====================
-
-def json_response(data, status=200):
-    """Crea una respuesta JSON correctamente formateada"""
-    return Response(
-        json.dumps(data),
-        status=status,
-        content_type='application/json; charset=utf-8'
-    )
+PRODUCT_PAGE_SIZE = 50
+MAX_PRODUCT_PAGE_SIZE = 200
 
-def convert_decimal_to_float(obj):
-    """Convierte Decimal a float para JSON serialization"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+# ==================== FUNCIONES AUXILIARES ====================
 
 def format_product(product):
     """Formatea un producto para retornarlo en JSON"""
@@ -31,24 +20,69 @@ def format_product(product):
         'name': product.name,
         'description': product.description,
         'sku': product.sku,
-        'price': float(product.price),  # Convertir Decimal a float
-        'cost': float(product.cost) if product.cost else None,
+        'price': product.price,  # Decimal y datetime los codifica el renderer JSON
+        'cost': product.cost,
         'stock': product.stock,
         'photo_url': product.photo_url,
         'is_active': product.is_active,
         'attributes': product.attributes or {},
-        'created_at': product.created_at.isoformat(),
-        'updated_at': product.updated_at.isoformat()
+        'created_at': product.created_at,
+        'updated_at': product.updated_at,
+        'version': product.version
+    }
+
+def list_org_products(request, org_id, active_only):
+    """
+    Productos de una organización con su total (exacto o estimado, ver app.counting).
+    Sin limit ni cursor se retornan todos; con ellos se pagina por cursor (id ascendente).
+    """
+    params = request.GET
+    paginate = 'limit' in params or 'cursor' in params
+    try:
+        limit = min(max(int(params.get('limit', PRODUCT_PAGE_SIZE)), 1), MAX_PRODUCT_PAGE_SIZE)
+        cursor = int(params['cursor']) if params.get('cursor') else None
+    except ValueError:
+        return json_response({'error': 'Parámetros de paginación inválidos'}, status=400)
+    
+    db = request.dbsession
+    query = db.query(Product).filter(Product.org_id == org_id)
+    if active_only:
+        query = query.filter(Product.is_active == True)
+    
+    if not paginate:
+        products = query.all()
+        return {
+            'products': [format_product(p) for p in products],
+            'count': len(products),
+            'total': len(products),
+            'total_is_estimate': False
+        }
+    
+    if cursor is not None:
+        query = query.filter(Product.id > cursor)
+    # Un registro extra indica si existe una página siguiente
+    products = query.order_by(Product.id).limit(limit + 1).all()
+    has_more = len(products) > limit
+    products = products[:limit]
+    total, total_is_estimate = product_count(db, org_id, active_only)
+    
+    return {
+        'products': [format_product(p) for p in products],
+        'count': len(products),
+        'total': total,
+        'total_is_estimate': total_is_estimate,
+        'next_cursor': products[-1].id if has_more else None,
+        'limit': limit
     }
 
 # ==================== RUTAS ====================
 @view_config(route_name='list_products_public', renderer='json', request_method='GET')
 def list_products_public(request):
-    """Lista todos los productos de una organización (PÚBLICO - sin autenticación)"""
+    """Lista los productos activos de una organización (PÚBLICO - sin autenticación)"""
     try:
         org_id = request.matchdict.get('org_id')
         
-        db = SessionLocal()
+        db = request.dbsession
         
         # Validar que la organización existe y está activa
         org = db.query(Organization).filter(
@@ -57,20 +91,10 @@ def list_products_public(request):
         ).first()
         
         if not org:
-            db.close()
             return json_response({'error': 'Organización no encontrada'}, status=404)
         
-        # Obtener solo productos activos
-        products = db.query(Product).filter(
-            Product.org_id == org_id,
-            Product.is_active == True
-        ).all()
-        db.close()
-        
-        return {
-            'products': [format_product(p) for p in products],
-            'count': len(products)
-        }
+        # Solo productos activos
+        return list_org_products(request, org.id, active_only=True)
     
     except Exception as e:
         return json_response({'error': str(e)}, status=500)
@@ -79,21 +103,18 @@ def list_products_public(request):
 def create_product(request):
     """Crea un nuevo producto"""
     try:
-        token = extract_token(request)
-        if not token:
-            return json_response({'error': 'Token requerido'}, status=401)
-        
-        verify_token(token)
+        user_id, error = get_current_user_id(request)
+        if error:
+            return error
         
         org_id = request.matchdict.get('org_id')
         data = request.json_body
         
-        db = SessionLocal()
+        db = request.dbsession
         
         # Validar que la organización existe
         org = db.query(Organization).filter(Organization.id == org_id).first()
         if not org:
-            db.close()
             return json_response({'error': 'Organización no encontrada'}, status=404)
         
         # Crear producto sin SKU (se generará automáticamente)
@@ -113,13 +134,14 @@ def create_product(request):
         db.add(new_product)
         db.commit()
         db.refresh(new_product)
-        db.close()
         
+        request.response.headers['ETag'] = version_etag(new_product.version)
         return {
             'message': 'Producto creado exitosamente',
             'product_id': new_product.id,
             'name': new_product.name,
-            'sku': new_product.sku
+            'sku': new_product.sku,
+            'version': new_product.version
         }
     
     except KeyError as e:
@@ -131,27 +153,26 @@ def create_product(request):
 def get_product(request):
     """Obtiene un producto específico"""
     try:
-        token = extract_token(request)
-        if not token:
-            return json_response({'error': 'Token requerido'}, status=401)
-        
-        verify_token(token)
+        user_id, error = get_current_user_id(request)
+        if error:
+            return error
         
         org_id = request.matchdict.get('org_id')
         product_id = request.matchdict.get('product_id')
         
-        db = SessionLocal()
+        db = request.dbsession
         
         product = db.query(Product).filter(
             Product.id == product_id,
             Product.org_id == org_id
         ).first()
         
-        db.close()
         
         if not product:
             return json_response({'error': 'Producto no encontrado'}, status=404)
         
+        # El ETag es la versión: se envía en If-Match al actualizar
+        request.response.headers['ETag'] = version_etag(product.version)
         return format_product(product)
     
     except Exception as e:
@@ -159,31 +180,22 @@ def get_product(request):
 
 @view_config(route_name='list_products', renderer='json', request_method='GET')
 def list_products(request):
-    """Lista todos los productos de una organización"""
+    """Lista los productos de una organización (ver list_org_products)"""
     try:
-        token = extract_token(request)
-        if not token:
-            return json_response({'error': 'Token requerido'}, status=401)
-        
-        verify_token(token)
+        user_id, error = get_current_user_id(request)
+        if error:
+            return error
         
         org_id = request.matchdict.get('org_id')
         
-        db = SessionLocal()
+        db = request.dbsession
         
         # Validar que la organización existe
         org = db.query(Organization).filter(Organization.id == org_id).first()
         if not org:
-            db.close()
             return json_response({'error': 'Organización no encontrada'}, status=404)
         
-        products = db.query(Product).filter(Product.org_id == org_id).all()
-        db.close()
-        
-        return {
-            'products': [format_product(p) for p in products],
-            'count': len(products)
-        }
+        return list_org_products(request, org.id, active_only=False)
     
     except Exception as e:
         return json_response({'error': str(e)}, status=500)
@@ -192,17 +204,15 @@ def list_products(request):
 def update_product(request):
     """Actualiza un producto"""
     try:
-        token = extract_token(request)
-        if not token:
-            return json_response({'error': 'Token requerido'}, status=401)
-        
-        verify_token(token)
+        user_id, error = get_current_user_id(request)
+        if error:
+            return error
         
         org_id = request.matchdict.get('org_id')
         product_id = request.matchdict.get('product_id')
         data = request.json_body
         
-        db = SessionLocal()
+        db = request.dbsession
         
         product = db.query(Product).filter(
             Product.id == product_id,
@@ -210,9 +220,13 @@ def update_product(request):
         ).first()
         
         if not product:
-            db.close()
             return json_response({'error': 'Producto no encontrado'}, status=404)
         
+        # Concurrencia optimista: If-Match con la versión leída (428 si falta, 412 si cambió)
+        error = check_if_match(request, product.version)
+        if error:
+            return error
+        
         updatable_fields = [
             'name', 'description', 'price', 'cost',
             'stock', 'photo_url', 'is_active', 'attributes'
@@ -224,13 +238,16 @@ def update_product(request):
         
         db.commit()
         db.refresh(product)
-        db.close()
         
+        request.response.headers['ETag'] = version_etag(product.version)
         return {
             'message': 'Producto actualizado exitosamente',
             'product': format_product(product)
         }
     
+    except StaleDataError:
+        # Otra solicitud confirmó un cambio entre la lectura y el UPDATE
+        return precondition_failed()
     except Exception as e:
         return json_response({'error': str(e)}, status=500)
 
@@ -238,16 +255,14 @@ def update_product(request):
 def delete_product(request):
     """Elimina un producto"""
     try:
-        token = extract_token(request)
-        if not token:
-            return json_response({'error': 'Token requerido'}, status=401)
-        
-        verify_token(token)
+        user_id, error = get_current_user_id(request)
+        if error:
+            return error
         
         org_id = request.matchdict.get('org_id')
         product_id = request.matchdict.get('product_id')
         
-        db = SessionLocal()
+        db = request.dbsession
         
         product = db.query(Product).filter(
             Product.id == product_id,
@@ -255,14 +270,14 @@ def delete_product(request):
         ).first()
         
         if not product:
-            db.close()
             return json_response({'error': 'Producto no encontrado'}, status=404)
         
         db.delete(product)
         db.commit()
-        db.close()
         
         return {'message': 'Producto eliminado exitosamente'}
     
+    except StaleDataError:
+        return precondition_failed()
     except Exception as e:
         return json_response({'error': str(e)}, status=500)
\ No newline at end of file
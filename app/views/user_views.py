@@ -1,85 +1,130 @@
 # app/views/user_views.py
 from pyramid.view import view_config
-from pyramid.response import Response
-import json
-from app.database import SessionLocal
+from app.renderers import json_response
+from app.catalog_cache import catalog_cache
 from app.models.user import User
 from app.models.identity_type import IdentityType
 from app.models.gender import Gender
-from app.middleware.jwt_middleware import extract_token, verify_token
-from datetime import datetime
+from app.middleware.jwt_middleware import get_current_user_id
+from app.jobs import enqueue, job_handler
+from app.counting import count_rows
+from app.views.job_views import accepted_job_response
+from app.request_body import (
+    BULK_MAX_BODY_SIZE, JSONStreamError, RequestBodyTooLarge, body_too_large_response, iter_json_array
+)
+from itertools import islice
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.types import String
 
-def get_current_user_id(request, require_token=True):
-    """Extrae y valida el token, retorna el user_id"""
-    token = extract_token(request)
-    if not token:
-        if require_token:
-            return None, Response(json.dumps({'error': 'Token requerido'}), status=401)
-        return None, None
-    
-    try:
-        payload = verify_token(token)
-        return payload.get('user_id'), None
-    except Exception as e:
-        return None, Response(json.dumps({'error': str(e)}), status=400)
+USER_PAGE_SIZE = 50
+MAX_USER_PAGE_SIZE = 200
+USER_SEARCH_LIMIT = 20
+MAX_USER_SEARCH_LIMIT = 100
+USER_SEARCH_MIN_LENGTH = 3
+BULK_USER_LIMIT = 10000
+BULK_USER_SYNC_LIMIT = 1000  # más filas se procesan como job en segundo plano
+BULK_INSERT_CHUNK = 1000
+USER_REQUIRED_FIELDS = ['first_name', 'last_name', 'birth_date', 'identity_number', 'identity_type', 'gender']
+# Campos de texto de la importación masiva y su longitud máxima (la de la columna)
+USER_TEXT_FIELDS = [(name, User.__table__.c[name].type.length)
+                    for name in ('first_name', 'last_name', 'identity_number')]
+
+def query_users(db):
+    """Consulta de usuarios con los códigos de catálogo en el mismo SELECT (sin lazy loads)"""
+    return (
+        db.query(
+            User.id,
+            User.first_name,
+            User.last_name,
+            User.birth_date,
+            User.identity_number,
+            IdentityType.code.label('identity_type'),
+            Gender.code.label('gender'),
+            User.is_active,
+            User.created_at
+        )
+        .join(IdentityType, User.identity_type_id == IdentityType.id)
+        .join(Gender, User.gender_id == Gender.id)
+    )
 
 def format_user(user):
-    """Convierte un usuario a diccionario formateado"""
+    """Convierte una fila de query_users a diccionario formateado"""
     return {
         'id': user.id,
         'first_name': user.first_name,
         'last_name': user.last_name,
-        'birth_date': user.birth_date.isoformat(),
+        'birth_date': user.birth_date,
         'identity_number': user.identity_number,
-        'identity_type': user.identity_type.code,
-        'gender': user.gender.code,
+        'identity_type': user.identity_type,
+        'gender': user.gender,
         'is_active': user.is_active,
-        'created_at': user.created_at.isoformat()
+        'created_at': user.created_at
     }
 
+def parse_datetime_param(value):
+    """Convierte un parámetro YYYY-MM-DD o ISO 8601 a datetime"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+def created_at_filters(created_from=None, created_to=None):
+    """Filtros de User.created_at para created_from/created_to.
+
+    Una fecha sin hora en created_to incluye el día completo: se compara con
+    < el día siguiente en lugar de <= la medianoche.
+    """
+    filters = []
+    if created_from:
+        filters.append(User.created_at >= parse_datetime_param(created_from))
+    if created_to:
+        try:
+            day = datetime.strptime(created_to, '%Y-%m-%d')
+        except ValueError:
+            filters.append(User.created_at <= datetime.fromisoformat(created_to))
+        else:
+            filters.append(User.created_at < day + timedelta(days=1))
+    return filters
+
 @view_config(route_name='create_user', renderer='json')
 def create_user(request):
     try:
         data = request.json_body
-        db = SessionLocal()
+        db = request.dbsession
         
         # Validar campos requeridos
         required_fields = ['first_name', 'last_name', 'birth_date', 'identity_number', 'identity_type', 'gender']
         missing = [f for f in required_fields if f not in data]
         if missing:
-            db.close()
-            return Response(
-                json.dumps({'error': f'Campos requeridos faltantes: {", ".join(missing)}'}),
+            return json_response(
+                {'error': f'Campos requeridos faltantes: {", ".join(missing)}'},
                 status=400
             )
         
         # Validar que el usuario no exista
         if db.query(User).filter(User.identity_number == data['identity_number']).first():
-            db.close()
-            return Response(
-                json.dumps({'error': 'El usuario con este número de identidad ya existe'}),
+            return json_response(
+                {'error': 'El usuario con este número de identidad ya existe'},
                 status=400
             )
         
+        catalogs = catalog_cache.get()
+        
         # Validar y obtener identity_type
-        identity_type = db.query(IdentityType).filter(
-            IdentityType.code == data['identity_type']
-        ).first()
+        identity_type = catalogs.identity_types_by_code.get(data['identity_type'])
         if not identity_type:
-            db.close()
-            return Response(
-                json.dumps({'error': f'Tipo de identidad inválido: {data["identity_type"]}'}),
+            return json_response(
+                {'error': f'Tipo de identidad inválido: {data["identity_type"]}'},
                 status=400
             )
         
         # Validar y obtener gender
-        gender = db.query(Gender).filter(
-            Gender.code == data['gender']
-        ).first()
+        gender = catalogs.genders_by_code.get(data['gender'])
         if not gender:
-            db.close()
-            return Response(
-                json.dumps({'error': f'Género inválido: {data["gender"]}'}),
+            return json_response(
+                {'error': f'Género inválido: {data["gender"]}'},
                 status=400
             )
         
@@ -87,9 +132,8 @@ def create_user(request):
         try:
             birth_date = datetime.strptime(data['birth_date'], '%Y-%m-%d').date()
         except ValueError:
-            db.close()
-            return Response(
-                json.dumps({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}),
+            return json_response(
+                {'error': 'Formato de fecha inválido. Use YYYY-MM-DD'},
                 status=400
             )
         
@@ -98,22 +142,212 @@ def create_user(request):
             last_name=data['last_name'],
             birth_date=birth_date,
             identity_number=data['identity_number'],
-            identity_type_id=identity_type.id,
-            gender_id=gender.id,
+            identity_type_id=identity_type['id'],
+            gender_id=gender['id'],
             is_active=True
         )
         
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
-        db.close()
         
         return {
             'message': 'Usuario creado exitosamente',
             'user_id': new_user.id
         }
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
+
+class UserImport:
+    """
+    Importación de usuarios por bloques. Cada bloque se valida, se consulta
+    en una sola sentencia qué números de identidad ya existen y se inserta
+    antes de pasar al siguiente; los resultados (created / error) se acumulan
+    en el orden de entrada.
+    """
+    
+    def __init__(self, db):
+        self.db = db
+        # Catálogos resueltos en memoria desde la caché compartida
+        catalogs = catalog_cache.get()
+        self.identity_types = catalogs.identity_types_by_code
+        self.genders = catalogs.genders_by_code
+        self.seen = set()
+        self.results = []
+    
+    def validate(self, data):
+        """Retorna (valores para el INSERT, None) o (None, mensaje de error)"""
+        if not isinstance(data, dict):
+            return None, 'Registro inválido'
+        
+        missing = [f for f in USER_REQUIRED_FIELDS if f not in data]
+        if missing:
+            return None, f'Campos requeridos faltantes: {", ".join(missing)}'
+        
+        for field, max_length in USER_TEXT_FIELDS:
+            value = data[field]
+            if not isinstance(value, str) or not value.strip():
+                return None, f'El campo {field} debe ser un texto no vacío'
+            if len(value) > max_length:
+                return None, f'El campo {field} supera los {max_length} caracteres'
+        
+        # Un código que no es texto (lista, objeto) no puede buscarse en el catálogo
+        code = data['identity_type']
+        identity_type = self.identity_types.get(code) if isinstance(code, str) else None
+        if identity_type is None:
+            return None, f'Tipo de identidad inválido: {data["identity_type"]}'
+        
+        code = data['gender']
+        gender = self.genders.get(code) if isinstance(code, str) else None
+        if gender is None:
+            return None, f'Género inválido: {data["gender"]}'
+        
+        try:
+            birth_date = datetime.strptime(data['birth_date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return None, 'Formato de fecha inválido. Use YYYY-MM-DD'
+        
+        return {
+            'first_name': data['first_name'],
+            'last_name': data['last_name'],
+            'birth_date': birth_date,
+            'identity_number': data['identity_number'],
+            'identity_type_id': identity_type['id'],
+            'gender_id': gender['id'],
+            'is_active': True
+        }, None
+    
+    def add(self, records):
+        """Valida e inserta un bloque de hasta BULK_INSERT_CHUNK registros"""
+        offset = len(self.results)
+        self.results.extend([None] * len(records))
+        pending = {}
+        
+        for index, data in enumerate(records, start=offset):
+            values, error = self.validate(data)
+            if values is not None and values['identity_number'] in self.seen:
+                values, error = None, 'Número de identidad duplicado en el lote'
+            if error:
+                self.results[index] = {'index': index, 'status': 'error', 'error': error}
+                continue
+            self.seen.add(values['identity_number'])
+            pending[values['identity_number']] = (index, values)
+        
+        if not pending:
+            return
+        
+        # Una sola consulta por bloque para detectar los números de identidad existentes
+        existing = self.db.query(User.identity_number).filter(
+            User.identity_number == any_(bindparam('numbers', list(pending), type_=ARRAY(String)))
+        ).all()
+        for (identity_number,) in existing:
+            index, _ = pending.pop(identity_number)
+            self.results[index] = {'index': index, 'status': 'error',
+                                   'error': 'El usuario con este número de identidad ya existe'}
+        
+        if not pending:
+            return
+        
+        # INSERT multi-fila; ON CONFLICT cubre inserciones concurrentes
+        rows = list(pending.values())
+        statement = (
+            insert(User.__table__)
+            .values([values for _, values in rows])
+            .on_conflict_do_nothing(index_elements=['identity_number'])
+            .returning(User.__table__.c.id, User.__table__.c.identity_number)
+        )
+        created = dict((number, new_id) for new_id, number in self.db.execute(statement))
+        
+        for index, values in rows:
+            new_id = created.get(values['identity_number'])
+            if new_id is None:
+                self.results[index] = {'index': index, 'status': 'error',
+                                       'error': 'El usuario con este número de identidad ya existe'}
+            else:
+                self.results[index] = {'index': index, 'status': 'created', 'user_id': new_id}
+    
+    def summary(self):
+        created_count = sum(1 for r in self.results if r['status'] == 'created')
+        return {
+            'created': created_count,
+            'failed': len(self.results) - created_count,
+            'results': self.results
+        }
+
+def import_users(db, records, progress=None):
+    """
+    Valida e inserta usuarios en bloques de BULK_INSERT_CHUNK; retorna un
+    resultado por fila (created / error) en el mismo orden.
+    progress(porcentaje) se llama después de cada bloque.
+    """
+    importer = UserImport(db)
+    for start in range(0, len(records), BULK_INSERT_CHUNK):
+        importer.add(records[start:start + BULK_INSERT_CHUNK])
+        if progress is not None:
+            progress(100 * len(importer.results) // len(records))
+    return importer.summary()
+
+@job_handler('bulk_create_users')
+def bulk_create_users_job(ctx):
+    """Importación de usuarios en segundo plano (ver bulk_create_users)"""
+    return import_users(ctx.db, ctx.payload['records'], progress=ctx.progress)
+
+@view_config(route_name='bulk_create_users', renderer='json', max_body_size=BULK_MAX_BODY_SIZE)
+def bulk_create_users(request):
+    """
+    Crea usuarios en lote a partir de un arreglo JSON.
+    Retorna un resultado por fila (created / error) en el mismo orden.
+    
+    El cuerpo se decodifica elemento por elemento (sin request.json_body) y
+    cada bloque de BULK_INSERT_CHUNK filas se valida e inserta en cuanto se
+    lee. Con ?async=true, o en cuanto se leen más de BULK_USER_SYNC_LIMIT
+    filas, lo insertado se revierte y se encola un job con todas las filas;
+    se responde 202 con la URL para consultar su estado.
+    """
+    user_id, error = get_current_user_id(request)
+    if error:
+        return error
+    
+    db = request.dbsession
+    run_async = request.params.get('async') == 'true'
+    importer = UserImport(db) if not run_async else None
+    # Filas crudas leídas, por si la importación pasa a un job (en modo
+    # síncrono son a lo sumo BULK_USER_SYNC_LIMIT más un bloque)
+    records = []
+    
+    try:
+        items = iter_json_array(request)
+        for batch in iter(lambda: list(islice(items, BULK_INSERT_CHUNK)), []):
+            records.extend(batch)
+            if len(records) > BULK_USER_LIMIT:
+                return json_response(
+                    {'error': f'Máximo {BULK_USER_LIMIT} usuarios por solicitud'},
+                    status=400
+                )
+            if run_async:
+                continue
+            if len(records) > BULK_USER_SYNC_LIMIT:
+                # Demasiadas filas para responder en línea: todo pasa al job
+                db.rollback()
+                run_async, importer = True, None
+                continue
+            importer.add(batch)
+    except JSONStreamError:
+        return json_response({'error': 'Se espera un arreglo JSON de usuarios'}, status=400)
+    except RequestBodyTooLarge as e:
+        return body_too_large_response(e.args[0])
+    except Exception as e:
+        return json_response({'error': str(e)}, status=500)
+    
+    try:
+        if run_async:
+            job = enqueue(db, 'bulk_create_users', {'records': records}, user_id=user_id)
+            return accepted_job_response(request, job)
+        
+        db.commit()
+        return importer.summary()
+    except Exception as e:
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='get_user', renderer='json')
 def get_user(request):
@@ -122,33 +356,130 @@ def get_user(request):
         return error
     
     try:
-        db = SessionLocal()
-        user = db.query(User).filter(User.id == user_id).first()
-        db.close()
+        db = request.dbsession
+        user = query_users(db).filter(User.id == user_id).first()
         
         if not user:
-            return Response(json.dumps({'error': 'Usuario no encontrado'}), status=404)
+            return json_response({'error': 'Usuario no encontrado'}, status=404)
         
         return format_user(user)
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='list_users', renderer='json')
 def list_users(request):
+    """
+    Lista usuarios paginados por cursor (id ascendente).
+    Parámetros: limit, cursor, is_active (true|false|all), created_from, created_to.
+    """
+    user_id, error = get_current_user_id(request)
+    if error:
+        return error
+    
+    params = request.GET
+    try:
+        limit = min(max(int(params.get('limit', USER_PAGE_SIZE)), 1), MAX_USER_PAGE_SIZE)
+        cursor = int(params['cursor']) if params.get('cursor') else None
+        filters = created_at_filters(params.get('created_from'), params.get('created_to'))
+    except ValueError:
+        return json_response(
+            {'error': 'Parámetros de paginación o fecha inválidos'},
+            status=400
+        )
+    
+    is_active = params.get('is_active', 'true').lower()
+    if is_active not in ('true', 'false', 'all'):
+        return json_response(
+            {'error': 'is_active debe ser true, false o all'},
+            status=400
+        )
+    
+    try:
+        db = request.dbsession
+        if is_active != 'all':
+            filters.append(User.is_active == (is_active == 'true'))
+        
+        # Total sobre los filtros (sin cursor): exacto hasta el umbral, estimado por encima
+        total, total_is_estimate = count_rows(db, db.query(User.id).filter(*filters))
+        
+        query = query_users(db).filter(*filters)
+        if cursor is not None:
+            query = query.filter(User.id > cursor)
+        
+        # Un registro extra indica si existe una página siguiente
+        users = query.order_by(User.id).limit(limit + 1).all()
+        
+        has_more = len(users) > limit
+        users = users[:limit]
+        
+        return {
+            'users': [format_user(u) for u in users],
+            'total': total,
+            'total_is_estimate': total_is_estimate,
+            'next_cursor': users[-1].id if has_more else None,
+            'limit': limit
+        }
+    except Exception as e:
+        return json_response({'error': str(e)}, status=500)
+
+@view_config(route_name='search_users', renderer='json')
+def search_users(request):
+    """
+    Busca usuarios activos por nombre, apellido o número de identidad.
+    Combina coincidencia por prefijo y similitud de trigramas (pg_trgm),
+    ordenando por la mejor similitud. Parámetros: q, limit.
+    """
     user_id, error = get_current_user_id(request)
     if error:
         return error
     
+    term = request.GET.get('q', '').strip()
+    if len(term) < USER_SEARCH_MIN_LENGTH:
+        return json_response(
+            {'error': f'La búsqueda requiere al menos {USER_SEARCH_MIN_LENGTH} caracteres'},
+            status=400
+        )
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', USER_SEARCH_LIMIT)), 1), MAX_USER_SEARCH_LIMIT)
+    except ValueError:
+        return json_response({'error': 'Parámetro limit inválido'}, status=400)
+    
+    # Escapar comodines de LIKE para que el término se trate literalmente
+    prefix = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    
     try:
-        db = SessionLocal()
-        users = db.query(User).filter(User.is_active == True).all()
-        db.close()
+        db = request.dbsession
+        
+        # Cada condición puede resolverse con los índices GIN gin_trgm_ops
+        matches = or_(
+            User.identity_number.like(prefix),
+            User.first_name.ilike(prefix),
+            User.last_name.ilike(prefix),
+            User.first_name.op('%')(term),
+            User.last_name.op('%')(term),
+            User.identity_number.op('%')(term)
+        )
+        score = func.greatest(
+            func.similarity(User.first_name, term),
+            func.similarity(User.last_name, term),
+            func.similarity(User.identity_number, term)
+        )
+        
+        users = (
+            query_users(db)
+            .filter(User.is_active == True, matches)
+            .order_by(score.desc(), User.id)
+            .limit(limit)
+            .all()
+        )
         
         return {
-            'users': [format_user(u) for u in users]
+            'users': [format_user(u) for u in users],
+            'count': len(users)
         }
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='update_user', renderer='json')
 def update_user(request):
@@ -158,12 +489,11 @@ def update_user(request):
     
     try:
         data = request.json_body
-        db = SessionLocal()
+        db = request.dbsession
         
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
-            db.close()
-            return Response(json.dumps({'error': 'Usuario no encontrado'}), status=404)
+            return json_response({'error': 'Usuario no encontrado'}, status=404)
         
         # Actualizar campos simples
         if 'first_name' in data:
@@ -178,44 +508,36 @@ def update_user(request):
             try:
                 user.birth_date = datetime.strptime(data['birth_date'], '%Y-%m-%d').date()
             except ValueError:
-                db.close()
-                return Response(
-                    json.dumps({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}),
+                return json_response(
+                    {'error': 'Formato de fecha inválido. Use YYYY-MM-DD'},
                     status=400
                 )
         
         # Actualizar identity_type con validación
         if 'identity_type' in data:
-            identity_type = db.query(IdentityType).filter(
-                IdentityType.code == data['identity_type']
-            ).first()
+            identity_type = catalog_cache.get().identity_types_by_code.get(data['identity_type'])
             if not identity_type:
-                db.close()
-                return Response(
-                    json.dumps({'error': f'Tipo de identidad inválido: {data["identity_type"]}'}),
+                return json_response(
+                    {'error': f'Tipo de identidad inválido: {data["identity_type"]}'},
                     status=400
                 )
-            user.identity_type_id = identity_type.id
+            user.identity_type_id = identity_type['id']
         
         # Actualizar gender con validación
         if 'gender' in data:
-            gender = db.query(Gender).filter(
-                Gender.code == data['gender']
-            ).first()
+            gender = catalog_cache.get().genders_by_code.get(data['gender'])
             if not gender:
-                db.close()
-                return Response(
-                    json.dumps({'error': f'Género inválido: {data["gender"]}'}),
+                return json_response(
+                    {'error': f'Género inválido: {data["gender"]}'},
                     status=400
                 )
-            user.gender_id = gender.id
+            user.gender_id = gender['id']
         
         db.commit()
-        db.close()
         
         return {'message': 'Usuario actualizado exitosamente'}
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
+        return json_response({'error': str(e)}, status=500)
 
 @view_config(route_name='delete_user', renderer='json')
 def delete_user(request):
@@ -224,18 +546,16 @@ def delete_user(request):
         return error
     
     try:
-        db = SessionLocal()
+        db = request.dbsession
         user = db.query(User).filter(User.id == user_id).first()
         
         if not user:
-            db.close()
-            return Response(json.dumps({'error': 'Usuario no encontrado'}), status=404)
+            return json_response({'error': 'Usuario no encontrado'}, status=404)
         
         # Soft delete - marcar como inactivo
         user.is_active = False
         db.commit()
-        db.close()
         
         return {'message': 'Usuario eliminado exitosamente'}
     except Exception as e:
-        return Response(json.dumps({'error': str(e)}), status=500)
\ No newline at end of file
+        return json_response({'error': str(e)}, status=500)
\ No newline at end of file
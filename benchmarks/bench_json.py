@@ -0,0 +1,109 @@
+"""
+Microbenchmark: serialización de un listado de 10k productos.
+
+Compara el camino anterior (format_product con float()/isoformat() + json.dumps)
+contra el actual (format_product sin conversiones + app.renderers.dumps).
+
+Uso:
+    python -m benchmarks.bench_json [--products 10000] [--repeat 5]
+"""
+import os
+import json
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# El engine se crea al importar app.database pero no se conecta
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/benchmark')
+
+from app.models.product import Product  # noqa: E402
+from app.views.product_views import format_product  # noqa: E402
+from app.renderers import dumps, orjson  # noqa: E402
+
+
+def legacy_format_product(product):
+    """format_product tal como era antes del renderer (baseline)"""
+    return {
+        'id': product.id,
+        'org_id': product.org_id,
+        'name': product.name,
+        'description': product.description,
+        'sku': product.sku,
+        'price': float(product.price),
+        'cost': float(product.cost) if product.cost else None,
+        'stock': product.stock,
+        'photo_url': product.photo_url,
+        'is_active': product.is_active,
+        'attributes': product.attributes or {},
+        'created_at': product.created_at.isoformat(),
+        'updated_at': product.updated_at.isoformat(),
+        'version': product.version
+    }
+
+
+def make_products(count):
+    base = datetime(2024, 1, 1, 12, 30, 15, 123456)
+    return [
+        Product(
+            id=i,
+            org_id=1 + i % 50,
+            name=f'Producto {i}',
+            description='Descripción de prueba con acentos: café, niño',
+            sku=f'ORG1-202401011230-{i:05X}',
+            price=Decimal('19.99') + i,
+            cost=Decimal('7.25'),
+            stock=i % 100,
+            photo_url=f'https://cdn.example.com/p/{i}.jpg',
+            is_active=True,
+            attributes={'color': 'rojo', 'talla': 'M', 'tags': ['a', 'b']},
+            created_at=base + timedelta(seconds=i),
+            updated_at=base + timedelta(seconds=2 * i),
+            version=1 + i % 3
+        )
+        for i in range(count)
+    ]
+
+
+def measure(fn, repeat):
+    fn()  # warmup
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    products = make_products(args.products)
+
+    def legacy():
+        payload = {'products': [legacy_format_product(p) for p in products], 'count': len(products)}
+        return json.dumps(payload).encode('utf-8')
+
+    def current():
+        payload = {'products': [format_product(p) for p in products], 'count': len(products)}
+        return dumps(payload)
+
+    # Ambos caminos deben producir el mismo documento
+    assert json.loads(legacy()) == json.loads(current())
+
+    encoder = 'orjson' if orjson is not None else 'json (stdlib)'
+    print(f'{args.products} productos, {args.repeat} repeticiones, encoder: {encoder}')
+    results = {}
+    for name, fn in (('legacy', legacy), ('current', current)):
+        samples = measure(fn, args.repeat)
+        results[name] = statistics.median(samples)
+        print(f'  {name:<8} mediana {results[name] * 1000:8.2f} ms  min {min(samples) * 1000:8.2f} ms')
+    print(f'  speedup  x{results["legacy"] / results["current"]:.2f}')
+
+
+if __name__ == '__main__':
+    main()
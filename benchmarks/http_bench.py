@@ -0,0 +1,379 @@
+"""
+Benchmark HTTP de extremo a extremo contra una base PostgreSQL local.
+
+Arranca app.main en el mismo proceso (WSGI directo) o bajo waitress y ejecuta
+mezclas de operaciones realistas desde varios hilos:
+
+    public     lecturas públicas de catálogos, organizaciones y productos
+    login      inicio de sesión
+    products   CRUD de productos de una organización
+    employees  alta, listado y baja de empleados
+
+Cada hilo crea sus propios datos (usuario, cuenta, organización, empleados)
+antes de medir, así que la base debe tener al menos un tipo de identidad,
+un género y un país activos. El resultado por ruta (peticiones, errores,
+throughput, p50/p95/p99) se escribe como JSON junto con el commit actual
+para comparar ejecuciones entre commits.
+
+Uso:
+    DATABASE_URL=postgresql://... python -m benchmarks.http_bench \\
+        [--server inprocess|waitress] [--concurrency 8] [--duration 30] \\
+        [--warmup 5] [--mix public=5,login=1,products=3,employees=1] \\
+        [--seed 1] [--output benchmarks/results/http.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import platform
+import threading
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+DEFAULT_MIX = 'public=5,login=1,products=3,employees=1'
+PASSWORD = 'bench-password'
+
+
+# ==================== Clientes ====================
+
+class InProcessClient:
+    """Llama a la aplicación WSGI directamente, sin sockets"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, body=None, token=None, headers=None):
+        from webob import Request
+        req = Request.blank(path, method=method, headers=headers)
+        if token:
+            req.headers['Authorization'] = f'Bearer {token}'
+        if body is not None:
+            req.body = json.dumps(body).encode('utf-8')
+            req.content_type = 'application/json'
+        resp = req.get_response(self.app)
+        return resp.status_code, resp.body
+
+
+class HTTPClient:
+    """Cliente HTTP real (requests) con una sesión keep-alive por hilo"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, token=None, headers=None):
+        import requests
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        headers = dict(headers or {})
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        resp = session.request(method, self.base_url + path, json=body, headers=headers)
+        return resp.status_code, resp.content
+
+
+def start_waitress(app, threads):
+    """Sirve la app con waitress en un puerto libre, en un hilo daemon"""
+    from waitress.server import create_server
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    server = create_server(app, host='127.0.0.1', port=port, threads=threads)
+    threading.Thread(target=server.run, name='bench-waitress', daemon=True).start()
+    return server, f'http://127.0.0.1:{port}'
+
+
+# ==================== Escenarios ====================
+
+class Worker:
+    """Datos propios de un hilo de carga y las operaciones que ejecuta"""
+
+    def __init__(self, client, run_id, index, catalogs, rng):
+        self.client = client
+        self.rng = rng
+        self.tag = f'{run_id}-{index}'
+        self.catalogs = catalogs
+        self.samples = []
+        self.recording = False
+        self.products = []
+        self.versions = {}  # product_id -> versión para If-Match
+        self.employees = []
+        self.free_users = []
+
+    def call(self, route, method, path, body=None, token=None, expected=(200,), headers=None):
+        start = time.perf_counter()
+        try:
+            status, payload = self.client.request(method, path, body, token, headers)
+            ok = status in expected
+        except Exception:
+            status, payload, ok = None, b'', False
+        elapsed = time.perf_counter() - start
+        if self.recording:
+            self.samples.append((route, elapsed, ok))
+        return status, (json.loads(payload) if ok and payload else None)
+
+    def create_user(self, suffix):
+        identity_type = self.catalogs['identity_types'][0]['code']
+        gender = self.catalogs['genders'][0]['code']
+        status, data = self.call('create_user', 'POST', '/api/users', {
+            'first_name': 'Bench', 'last_name': suffix, 'birth_date': '1990-01-01',
+            'identity_number': f'{self.tag}-{suffix}',
+            'identity_type': identity_type, 'gender': gender,
+        })
+        if data is None:
+            raise RuntimeError(f'No se pudo crear el usuario de prueba ({status})')
+        return data['user_id']
+
+    def setup(self, employee_pool):
+        """Crea el propietario, su cuenta, su organización y empleados candidatos"""
+        self.email = f'{self.tag}@bench.local'
+        owner_id = self.create_user('owner')
+        self.call('register_account', 'POST', '/api/accounts/register',
+                  {'user_id': owner_id, 'email': self.email, 'password': PASSWORD})
+        self.login()
+        _, org = self.call('create_org', 'POST', '/api/organizations', {
+            'name': f'Bench {self.tag}', 'email': f'org-{self.email}',
+            'legal_name': f'Bench {self.tag} S.A.', 'org_type': 'bench',
+            'country_id': self.catalogs['countries'][0]['id'],
+        }, token=self.token)
+        self.org_id = org['organization_id']
+        self.free_users = [self.create_user(f'e{i}') for i in range(employee_pool)]
+        for _ in range(10):
+            self.create_product()
+
+    def login(self):
+        _, data = self.call('login', 'POST', '/api/accounts/login',
+                            {'email': self.email, 'password': PASSWORD})
+        if data is None:
+            raise RuntimeError('Login fallido en el benchmark')
+        self.token = data['token']
+
+    def create_product(self):
+        _, data = self.call('create_product', 'POST', f'/api/organizations/{self.org_id}/products', {
+            'name': f'Producto {self.rng.randrange(10**6)}',
+            'price': f'{self.rng.uniform(1, 500):.2f}',
+            'cost': f'{self.rng.uniform(1, 200):.2f}',
+            'stock': self.rng.randrange(1000),
+            'attributes': {'color': self.rng.choice(['rojo', 'azul', 'verde'])},
+        }, token=self.token)
+        if data is not None:
+            self.products.append(data['product_id'])
+            self.versions[data['product_id']] = data['version']
+
+    # ---- mezclas ----
+
+    def public(self):
+        choice = self.rng.random()
+        if choice < 0.4:
+            self.call('list_catalogs', 'GET', '/api/catalogs')
+        elif choice < 0.6:
+            self.call('list_countries', 'GET', '/api/countries')
+        elif choice < 0.8:
+            self.call('list_public_organizations', 'GET', '/api/public/organizations')
+        else:
+            self.call('list_products_public', 'GET', f'/api/public/organizations/{self.org_id}/products')
+
+    def products_crud(self):
+        base = f'/api/organizations/{self.org_id}/products'
+        choice = self.rng.random()
+        if choice < 0.2 or not self.products:
+            self.create_product()
+        elif choice < 0.5:
+            self.call('get_product', 'GET', f'{base}/{self.rng.choice(self.products)}', token=self.token)
+        elif choice < 0.75:
+            self.call('list_products', 'GET', base, token=self.token)
+        elif choice < 0.9:
+            product_id = self.rng.choice(self.products)
+            _, data = self.call('update_product', 'PUT', f'{base}/{product_id}',
+                                {'stock': self.rng.randrange(1000)}, token=self.token,
+                                headers={'If-Match': f'"{self.versions[product_id]}"'})
+            if data is not None:
+                self.versions[product_id] = data['product']['version']
+        elif len(self.products) > 5:
+            product_id = self.products.pop(self.rng.randrange(len(self.products)))
+            self.versions.pop(product_id, None)
+            self.call('delete_product', 'DELETE', f'{base}/{product_id}', token=self.token)
+        else:
+            self.create_product()
+
+    def employees_crud(self):
+        base = f'/api/organizations/{self.org_id}/employees'
+        choice = self.rng.random()
+        if choice < 0.4 and self.free_users:
+            user_id = self.free_users.pop()
+            _, data = self.call('add_employee', 'POST', base, {'user_id': user_id}, token=self.token)
+            if data is not None:
+                self.employees.append((data['employee_id'], user_id))
+            else:
+                self.free_users.append(user_id)
+        elif choice < 0.7 and self.employees:
+            employee_id, user_id = self.employees.pop(self.rng.randrange(len(self.employees)))
+            self.call('remove_employee', 'DELETE', f'{base}/{employee_id}', token=self.token)
+            self.free_users.append(user_id)
+        else:
+            self.call('list_employees', 'GET', base, token=self.token)
+
+
+SCENARIOS = {
+    'public': Worker.public,
+    'login': Worker.login,
+    'products': Worker.products_crud,
+    'employees': Worker.employees_crud,
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, weight = item.split('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f'Escenario desconocido: {name} (opciones: {", ".join(SCENARIOS)})')
+        mix[name] = float(weight)
+    return mix
+
+
+def run_worker(worker, mix, warmup_until, stop_at):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            return
+        worker.recording = now >= warmup_until
+        scenario = worker.rng.choices(names, weights)[0]
+        try:
+            SCENARIOS[scenario](worker)
+        except Exception:
+            # Un error de datos no debe detener el hilo; ya quedó registrado
+            pass
+
+
+# ==================== Reporte ====================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, duration):
+    by_route = {}
+    for route, elapsed, ok in samples:
+        by_route.setdefault(route, []).append((elapsed, ok))
+
+    def stats(entries):
+        latencies = sorted(elapsed * 1000 for elapsed, _ in entries)
+        return {
+            'requests': len(entries),
+            'errors': sum(1 for _, ok in entries if not ok),
+            'throughput_rps': round(len(entries) / duration, 2),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(latencies[-1], 3),
+        }
+
+    return {
+        'routes': {route: stats(entries) for route, entries in sorted(by_route.items())},
+        'total': stats([(elapsed, ok) for _, elapsed, ok in samples]) if samples else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=('inprocess', 'waitress'), default='inprocess')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help='segundos medidos')
+    parser.add_argument('--warmup', type=float, default=5, help='segundos sin medir al inicio')
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--employee-pool', type=int, default=20, help='usuarios candidatos a empleado por hilo')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='archivo JSON de resultados (por defecto stdout)')
+    args = parser.parse_args()
+
+    if not os.getenv('DATABASE_URL'):
+        raise SystemExit('DATABASE_URL es obligatorio (PostgreSQL local con el esquema migrado)')
+
+    from app import main as make_app
+    app = make_app({})
+
+    if args.server == 'waitress':
+        # El hilo de waitress es daemon: termina con el proceso
+        from app.database import WAITRESS_THREADS
+        _, base_url = start_waitress(app, WAITRESS_THREADS)
+        client = HTTPClient(base_url)
+    else:
+        client = InProcessClient(app)
+
+    status, body = client.request('GET', '/api/catalogs')
+    catalogs = json.loads(body) if status == 200 else {}
+    if not all(catalogs.get(key) for key in ('identity_types', 'genders', 'countries')):
+        raise SystemExit('Se necesita al menos un tipo de identidad, un género y un país activos')
+
+    mix = parse_mix(args.mix)
+    run_id = f'{int(time.time()):x}'
+    workers = [
+        Worker(client, run_id, i, catalogs, random.Random(args.seed * 1000 + i))
+        for i in range(args.concurrency)
+    ]
+    print(f'Preparando datos para {len(workers)} hilos...', file=sys.stderr)
+    for worker in workers:
+        worker.setup(args.employee_pool)
+
+    warmup_until = time.perf_counter() + args.warmup
+    stop_at = warmup_until + args.duration
+    threads = [
+        threading.Thread(target=run_worker, args=(worker, mix, warmup_until, stop_at))
+        for worker in workers
+    ]
+    print(f'Ejecutando {args.warmup:g}s de calentamiento + {args.duration:g}s medidos...', file=sys.stderr)
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples = [sample for worker in workers for sample in worker.samples]
+    result = {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'server': args.server,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'mix': mix,
+            'seed': args.seed,
+            'python': platform.python_version(),
+        },
+        **summarize(samples, args.duration),
+    }
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f'Resultados en {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+Microbenchmarks de los caminos calientes: serializadores, autenticación y modelos.
+
+Casos:
+    format_product              product_views.format_product
+    format_user                 user_views.format_user (fila de query_users)
+    format_public_organization  dict de list_public_organizations
+    create_token / verify_token / verify_token_cached
+    verify_password             Account.verify_password (bcrypt)
+    generate_sku                listener before_insert de Product
+
+Cada caso se calibra como timeit (autorange), se calienta y se mide --repeat
+veces con el GC desactivado; se reporta el tiempo por operación (mediana,
+mínimo, media, desviación). Con --output se guarda una línea base en JSON y
+con --compare se compara contra una línea base: las medianas que empeoran más
+de --threshold por ciento se marcan como regresión y el comando termina con
+código 1.
+
+Uso:
+    python -m benchmarks.micro_bench [--filter token] [--repeat 7] \\
+        [--output benchmarks/results/micro.json] \\
+        [--compare benchmarks/results/micro.json --threshold 10]
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+import platform
+import statistics
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+# El engine se crea al importar app.database pero no se conecta
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/benchmark')
+os.environ.setdefault('JWT_SECRET', 'benchmark-secret')
+
+from app.models.account import Account  # noqa: E402
+from app.models.organization import Organization  # noqa: E402
+from app.models.product import Product, generate_sku  # noqa: E402
+from app.views.product_views import format_product  # noqa: E402
+from app.views.user_views import format_user  # noqa: E402
+from app.views.organization_views import format_public_organization  # noqa: E402
+from app.middleware.jwt_middleware import create_token, verify_token, verify_token_cached  # noqa: E402
+from benchmarks.bench_json import make_products  # noqa: E402
+from benchmarks.http_bench import git_commit  # noqa: E402
+
+ITEMS = 1000
+
+# Misma forma que las filas de query_users (atributos por nombre)
+UserRow = namedtuple('UserRow', [
+    'id', 'first_name', 'last_name', 'birth_date', 'identity_number',
+    'identity_type', 'gender', 'is_active', 'created_at'
+])
+
+
+def make_user_rows(count):
+    base = datetime(2024, 1, 1, 8, 0, 0)
+    return [
+        UserRow(i, 'María', 'Pérez', date(1990, 1, 1) + timedelta(days=i), f'09{i:08d}',
+                'DNI', 'FEMALE', True, base + timedelta(minutes=i))
+        for i in range(count)
+    ]
+
+
+def make_organizations(count):
+    base = datetime(2024, 1, 1, 8, 0, 0)
+    return [
+        Organization(
+            id=i, name=f'Organización {i}', legal_name=f'Organización {i} S.A.',
+            email=f'org{i}@example.com', country_id=1, org_type='retail',
+            description='Tienda de barrio', primary_color='#000000',
+            secondary_color='#FFFFFF', tertiary_color='#F0F0F0', employee_count=i % 40,
+            address='Av. Siempre Viva 742', is_active=True, extra_data={'plan': 'pro'},
+            telephone='+593999999999', created_at=base + timedelta(hours=i)
+        )
+        for i in range(count)
+    ]
+
+
+# ==================== Casos ====================
+# Cada caso devuelve (función sin argumentos, operaciones por llamada)
+
+def case_format_product():
+    products = make_products(ITEMS)
+    return lambda: [format_product(p) for p in products], ITEMS
+
+
+def case_format_user():
+    rows = make_user_rows(ITEMS)
+    return lambda: [format_user(row) for row in rows], ITEMS
+
+
+def case_format_public_organization():
+    organizations = make_organizations(ITEMS)
+    return lambda: [format_public_organization(org) for org in organizations], ITEMS
+
+
+def case_create_token():
+    data = {'user_id': 42, 'email': 'bench@example.com'}
+    return lambda: create_token(data), 1
+
+
+def case_verify_token():
+    token = create_token({'user_id': 42, 'email': 'bench@example.com'})
+    return lambda: verify_token(token), 1
+
+
+def case_verify_token_cached():
+    token = create_token({'user_id': 42, 'email': 'bench@example.com'})
+    verify_token_cached(token)
+    return lambda: verify_token_cached(token), 1
+
+
+def case_verify_password():
+    account = Account(email='bench@example.com')
+    account.set_password('bench-password')
+    return lambda: account.verify_password('bench-password'), 1
+
+
+def case_generate_sku():
+    product = Product(org_id=7)
+
+    def run():
+        product.sku = None
+        generate_sku(None, None, product)
+    return run, 1
+
+
+CASES = {
+    'format_product': case_format_product,
+    'format_user': case_format_user,
+    'format_public_organization': case_format_public_organization,
+    'create_token': case_create_token,
+    'verify_token': case_verify_token,
+    'verify_token_cached': case_verify_token_cached,
+    'verify_password': case_verify_password,
+    'generate_sku': case_generate_sku,
+}
+
+
+# ==================== Medición ====================
+
+def measure(fn, ops_per_call, repeat, warmup, min_time):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    # autorange apunta a ~0.2 s; se ajusta a min_time por muestra
+    number = max(1, int(number * min_time / 0.2))
+    for _ in range(warmup):
+        timer.timeit(number)
+    samples = [timer.timeit(number) / (number * ops_per_call) for _ in range(repeat)]
+    return {
+        'median_ns': statistics.median(samples) * 1e9,
+        'min_ns': min(samples) * 1e9,
+        'mean_ns': statistics.fmean(samples) * 1e9,
+        'stdev_ns': (statistics.stdev(samples) if len(samples) > 1 else 0.0) * 1e9,
+        'ops_per_sample': number * ops_per_call,
+        'repeat': repeat,
+    }
+
+
+def format_ns(value):
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('µs', 1e3)):
+        if value >= scale:
+            return f'{value / scale:8.2f} {unit}'
+    return f'{value:8.1f} ns'
+
+
+def compare(results, baseline, threshold):
+    """Imprime la comparación y devuelve los casos que empeoraron"""
+    regressions = []
+    print(f'\nComparación contra {baseline["meta"].get("commit")} (umbral {threshold:g}%)')
+    for name, result in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f'  {name:<28} (sin línea base)')
+            continue
+        change = (result['median_ns'] / previous['median_ns'] - 1) * 100
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESIÓN'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  mejora'
+        print(f'  {name:<28} {format_ns(previous["median_ns"])} -> {format_ns(result["median_ns"])} '
+              f'{change:+7.1f}%{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', help='solo casos cuyo nombre contenga este texto')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--warmup', type=int, default=2, help='muestras descartadas antes de medir')
+    parser.add_argument('--min-time', type=float, default=0.2, help='segundos por muestra')
+    parser.add_argument('--output', help='guardar los resultados como línea base JSON')
+    parser.add_argument('--compare', help='línea base JSON contra la cual comparar')
+    parser.add_argument('--threshold', type=float, default=10.0, help='porcentaje que se considera regresión')
+    args = parser.parse_args()
+
+    results = {}
+    for name, case in CASES.items():
+        if args.filter and args.filter not in name:
+            continue
+        fn, ops_per_call = case()
+        results[name] = measure(fn, ops_per_call, args.repeat, args.warmup, args.min_time)
+        r = results[name]
+        print(f'  {name:<28} mediana {format_ns(r["median_ns"])}  min {format_ns(r["min_ns"])}  '
+              f'± {r["stdev_ns"] / r["median_ns"] * 100:4.1f}%')
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'Línea base guardada en {args.output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,433 @@
+"""
+Generador de datos sintéticos a gran escala para pruebas de carga.
+
+Crea usuarios (con los FKs de catálogos existentes), cuentas, organizaciones
+con roles y empleados, y productos con atributos JSONB de formas variadas.
+Los datos se cargan con COPY desde varios procesos y son deterministas a
+partir de --seed: la misma semilla y los mismos parámetros producen las
+mismas filas (salvo los ids base, que continúan después de los existentes).
+
+Distribuciones:
+    - tamaño de organización (empleados y productos): Pareto con --org-size-alpha,
+      pocas organizaciones muy grandes y muchas pequeñas
+    - atributos de producto: mezcla de formas con --attribute-mix
+      (clothing, electronics, food, services, empty)
+
+La base debe tener el esquema migrado y al menos un tipo de identidad, un
+género y un país. Las filas se agregan a las existentes; cada bloque se
+confirma por separado, así que una ejecución interrumpida deja datos parciales.
+
+Uso:
+    DATABASE_URL=postgresql://... python -m benchmarks.seed_dataset \\
+        [--users 200000] [--orgs 20000] [--products 2000000] \\
+        [--max-employees 2000] [--org-size-alpha 1.2] [--roles-per-org 4] \\
+        [--attribute-mix clothing=3,electronics=2,food=2,services=1,empty=1] \\
+        [--workers 4] [--chunk-size 50000] [--seed 42]
+"""
+import io
+import os
+import csv
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import multiprocessing
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+import bcrypt
+import psycopg2
+from sqlalchemy.engine import make_url
+
+# Fecha de referencia fija: los datos no dependen del día en que se generan
+EPOCH = datetime(2025, 1, 1)
+
+FIRST_NAMES = ['Ana', 'Luis', 'María', 'José', 'Carmen', 'Jorge', 'Lucía', 'Pedro', 'Sofía', 'Diego',
+               'Valeria', 'Andrés', 'Camila', 'Mateo', 'Daniela', 'Gabriel', 'Paula', 'Miguel']
+LAST_NAMES = ['García', 'Rodríguez', 'López', 'Martínez', 'Pérez', 'Gómez', 'Sánchez', 'Torres',
+              'Ramírez', 'Flores', 'Vargas', 'Castillo', 'Jiménez', 'Mendoza', 'Ortiz', 'Romero']
+ORG_TYPES = ['retail', 'restaurant', 'services', 'wholesale', 'manufacturing', 'ecommerce']
+ROLE_NAMES = ['Administrador', 'Vendedor', 'Bodega', 'Contador', 'Soporte', 'Gerente', 'Cajero', 'Marketing']
+PRODUCT_WORDS = ['Camiseta', 'Laptop', 'Café', 'Zapatos', 'Auriculares', 'Mesa', 'Silla', 'Chocolate',
+                 'Mochila', 'Monitor', 'Lámpara', 'Taza', 'Reloj', 'Teléfono', 'Galletas', 'Cuaderno']
+COLORS = ['rojo', 'azul', 'verde', 'negro', 'blanco', 'gris', 'amarillo']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+DEFAULT_ATTRIBUTE_MIX = 'clothing=3,electronics=2,food=2,services=1,empty=1'
+
+TABLES = ['users', 'accounts', 'organizations', 'organization_roles',
+          'organization_employees', 'org_employee_roles', 'products']
+
+_conn = None
+_plan = None
+
+
+# ==================== Utilidades ====================
+
+def chunk_rng(seed, *parts):
+    """RNG determinista por bloque (independiente del orden de los procesos)"""
+    return random.Random(':'.join(str(part) for part in (seed,) + parts))
+
+
+def deterministic_bcrypt(password, seed, rounds):
+    """Hash bcrypt calculado una sola vez, con sal derivada de la semilla"""
+    alphabet = b'./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+    digest = hashlib.sha256(f'{seed}:salt'.encode()).digest()
+    salt_chars = bytes(alphabet[b % 64] for b in digest[:21]) + b'.'
+    salt = b'$2b$%02d$' % rounds + salt_chars
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def timestamp(rng, max_days=3 * 365):
+    return EPOCH - timedelta(days=rng.random() * max_days)
+
+
+def pareto_sizes(rng, count, alpha, maximum):
+    return [min(maximum, int(rng.paretovariate(alpha))) for _ in range(count)]
+
+
+def split_total(weights, total):
+    """Reparte total en enteros proporcionales a weights (suma exacta)"""
+    weight_sum = sum(weights) or 1
+    counts = [int(total * w / weight_sum) for w in weights]
+    remainder = total - sum(counts)
+    order = sorted(range(len(weights)), key=lambda i: weights[i], reverse=True)
+    for i in order[:remainder]:
+        counts[i] += 1
+    return counts
+
+
+def prefix_sums(values):
+    sums, running = [0], 0
+    for value in values:
+        running += value
+        sums.append(running)
+    return sums
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, weight = item.split('=')
+        if name not in ATTRIBUTE_SHAPES:
+            raise SystemExit(f'Forma de atributos desconocida: {name} (opciones: {", ".join(ATTRIBUTE_SHAPES)})')
+        mix[name] = float(weight)
+    return mix
+
+
+def psycopg2_dsn(database_url):
+    url = make_url(database_url).set(drivername='postgresql')
+    return url.render_as_string(hide_password=False)
+
+
+# ==================== Atributos JSONB ====================
+
+def clothing_attributes(rng):
+    return {'talla': rng.choice(SIZES), 'color': rng.choice(COLORS),
+            'material': rng.choice(['algodón', 'poliéster', 'lana', 'lino'])}
+
+
+def electronics_attributes(rng):
+    attributes = {
+        'marca': rng.choice(['Acme', 'Nova', 'Zenit', 'Orion']),
+        'modelo': f'M-{rng.randrange(100, 999)}',
+        'garantia_meses': rng.choice([6, 12, 24]),
+        'specs': {'ram_gb': rng.choice([4, 8, 16, 32]), 'almacenamiento_gb': rng.choice([64, 128, 256, 512])},
+    }
+    if rng.random() < 0.3:
+        attributes['colores'] = rng.sample(COLORS, rng.randint(1, 3))
+    return attributes
+
+
+def food_attributes(rng):
+    return {'peso_g': rng.choice([100, 250, 500, 1000]),
+            'vencimiento_dias': rng.randint(7, 720),
+            'alergenos': rng.sample(['gluten', 'lactosa', 'nueces', 'soya', 'huevo'], rng.randint(0, 2)),
+            'organico': rng.random() < 0.2}
+
+
+def services_attributes(rng):
+    return {'duracion_min': rng.choice([30, 45, 60, 90]), 'modalidad': rng.choice(['presencial', 'remoto'])}
+
+
+ATTRIBUTE_SHAPES = {
+    'clothing': clothing_attributes,
+    'electronics': electronics_attributes,
+    'food': food_attributes,
+    'services': services_attributes,
+    'empty': lambda rng: {},
+}
+
+
+# ==================== Generadores por tabla ====================
+# Cada generador recibe (plan, rng, start, end) y devuelve filas para COPY.
+
+def user_rows(plan, rng, start, end):
+    for index in range(start, end):
+        user_id = plan['base']['users'] + index
+        yield (
+            user_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+            date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55)),
+            f'SEED{plan["seed"]}-{user_id}', rng.choice(plan['identity_type_ids']),
+            rng.choice(plan['gender_ids']), 't' if rng.random() < 0.95 else 'f', timestamp(rng),
+        )
+
+
+def account_rows(plan, rng, start, end):
+    for index in range(start, end):
+        user_id = plan['base']['users'] + index
+        yield (
+            plan['base']['accounts'] + index, user_id,
+            f'seed{plan["seed"]}-{user_id}@example.test', plan['password_hash'], timestamp(rng),
+        )
+
+
+def organization_rows(plan, rng, start, end):
+    for index in range(start, end):
+        org_id = plan['base']['organizations'] + index
+        created_at = timestamp(rng)
+        yield (
+            org_id, f'Organización {org_id}', f'seed{plan["seed"]}-org{org_id}@example.test',
+            f'Organización {org_id} S.A.', rng.choice(ORG_TYPES), None,
+            rng.choice(plan['country_ids']), f'+593{rng.randrange(10**8, 10**9)}',
+            plan['base']['users'] + rng.randrange(plan['users']),
+            '#%06X' % rng.randrange(1 << 24), '#FFFFFF', '#F0F0F0',
+            plan['employee_counts'][index], None, 't' if rng.random() < 0.97 else 'f',
+            json.dumps({'plan': rng.choice(['free', 'pro', 'enterprise']), 'seed': plan['seed']}),
+            created_at, created_at,
+        )
+
+
+def role_rows(plan, rng, start, end):
+    roles_per_org = plan['roles_per_org']
+    for org_index in range(start, end):
+        org_id = plan['base']['organizations'] + org_index
+        for j in range(roles_per_org):
+            yield (
+                plan['base']['organization_roles'] + org_index * roles_per_org + j,
+                org_id, ROLE_NAMES[j % len(ROLE_NAMES)], None, timestamp(rng),
+            )
+
+
+def employee_rows(plan, rng, start, end):
+    """Empleados y sus roles para las organizaciones [start, end)"""
+    employees, employee_roles = [], []
+    roles_per_org = plan['roles_per_org']
+    for org_index in range(start, end):
+        org_id = plan['base']['organizations'] + org_index
+        employee_id = plan['base']['organization_employees'] + plan['employee_offsets'][org_index]
+        size = plan['employee_counts'][org_index]
+        for user_index in rng.sample(range(plan['users']), size):
+            created_at = timestamp(rng)
+            employees.append((
+                employee_id, org_id, plan['base']['users'] + user_index,
+                't' if rng.random() < 0.9 else 'f', created_at, created_at,
+            ))
+            if roles_per_org:
+                first_role = plan['base']['organization_roles'] + org_index * roles_per_org
+                for j in rng.sample(range(roles_per_org), 1 if rng.random() < 0.8 else min(2, roles_per_org)):
+                    employee_roles.append((employee_id, first_role + j))
+            employee_id += 1
+    return employees, employee_roles
+
+
+def product_rows(plan, rng, start, end):
+    offsets = plan['product_offsets']
+    shapes = list(plan['attribute_mix'])
+    weights = [plan['attribute_mix'][name] for name in shapes]
+    for index in range(start, end):
+        org_index = bisect_right(offsets, index) - 1
+        product_id = plan['base']['products'] + index
+        # La forma de los atributos depende de la organización (catálogos homogéneos)
+        shape = chunk_rng(plan['seed'], 'shape', org_index).choices(shapes, weights)[0]
+        price = rng.uniform(0.5, 2000)
+        created_at = timestamp(rng)
+        yield (
+            product_id, plan['base']['organizations'] + org_index,
+            f'{rng.choice(PRODUCT_WORDS)} {rng.choice(COLORS)} {product_id}',
+            None if rng.random() < 0.5 else 'Producto generado para pruebas de carga',
+            f'SEED{plan["seed"]}-{product_id}', f'{price:.2f}', f'{price * rng.uniform(0.3, 0.8):.2f}',
+            rng.randrange(0, 5000), None, 't' if rng.random() < 0.9 else 'f',
+            json.dumps(ATTRIBUTE_SHAPES[shape](rng), ensure_ascii=False), created_at, created_at,
+        )
+
+
+COLUMNS = {
+    'users': 'id, first_name, last_name, birth_date, identity_number, identity_type_id, gender_id, '
+             'is_active, created_at',
+    'accounts': 'id, user_id, email, password_hash, created_at',
+    'organizations': 'id, name, email, legal_name, org_type, description, country_id, telephone, owner_id, '
+                     'primary_color, secondary_color, tertiary_color, employee_count, address, is_active, '
+                     'extra_data, created_at, updated_at',
+    'organization_roles': 'id, org_id, name, description, created_at',
+    'organization_employees': 'id, org_id, user_id, is_active, created_at, updated_at',
+    'org_employee_roles': 'employee_id, org_role_id',
+    'products': 'id, org_id, name, description, sku, price, cost, stock, photo_url, is_active, attributes, '
+                'created_at, updated_at',
+}
+
+
+# ==================== Carga ====================
+
+def copy_rows(cursor, table, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    buffer.seek(0)
+    cursor.copy_expert(f'COPY {table} ({COLUMNS[table]}) FROM STDIN WITH (FORMAT csv)', buffer)
+    return count
+
+
+def init_worker(dsn, plan):
+    global _conn, _plan
+    _conn = psycopg2.connect(dsn)
+    _plan = plan
+
+
+def load_chunk(task):
+    """Genera y copia un bloque; se ejecuta en un proceso del pool"""
+    table, start, end = task
+    rng = chunk_rng(_plan['seed'], table, start)
+    with _conn.cursor() as cursor:
+        if table == 'organization_employees':
+            employees, employee_roles = employee_rows(_plan, rng, start, end)
+            count = copy_rows(cursor, 'organization_employees', employees)
+            copy_rows(cursor, 'org_employee_roles', employee_roles)
+        else:
+            generator = {
+                'users': user_rows, 'accounts': account_rows, 'organizations': organization_rows,
+                'organization_roles': role_rows, 'products': product_rows,
+            }[table]
+            count = copy_rows(cursor, table, generator(_plan, rng, start, end))
+    _conn.commit()
+    return table, count
+
+
+def chunks(table, total, size):
+    return [(table, start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def employee_chunks(plan, size):
+    """Bloques de organizaciones con ~size empleados cada uno"""
+    tasks, start, pending = [], 0, 0
+    for org_index, count in enumerate(plan['employee_counts']):
+        pending += count
+        if pending >= size:
+            tasks.append(('organization_employees', start, org_index + 1))
+            start, pending = org_index + 1, 0
+    if start < len(plan['employee_counts']):
+        tasks.append(('organization_employees', start, len(plan['employee_counts'])))
+    return tasks
+
+
+def build_plan(args, cursor):
+    cursor.execute('SELECT id FROM identity_types WHERE is_active ORDER BY id')
+    identity_type_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute('SELECT id FROM genders WHERE is_active ORDER BY id')
+    gender_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute('SELECT id FROM countries WHERE is_active ORDER BY id')
+    country_ids = [row[0] for row in cursor.fetchall()]
+    if not (identity_type_ids and gender_ids and country_ids):
+        raise SystemExit('Se necesita al menos un tipo de identidad, un género y un país activos')
+
+    base = {}
+    for table in TABLES:
+        if table == 'org_employee_roles':
+            continue
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}')
+        base[table] = cursor.fetchone()[0]
+
+    rng = chunk_rng(args.seed, 'plan')
+    employee_counts = pareto_sizes(rng, args.orgs, args.org_size_alpha, min(args.max_employees, args.users))
+    # Las organizaciones con más empleados tienden a tener más productos
+    product_weights = [size * rng.uniform(0.5, 1.5) for size in employee_counts]
+    product_counts = split_total(product_weights, args.products)
+
+    return {
+        'seed': args.seed,
+        'users': args.users,
+        'roles_per_org': args.roles_per_org,
+        'attribute_mix': parse_mix(args.attribute_mix),
+        'identity_type_ids': identity_type_ids,
+        'gender_ids': gender_ids,
+        'country_ids': country_ids,
+        'base': base,
+        'employee_counts': employee_counts,
+        'employee_offsets': prefix_sums(employee_counts),
+        'product_offsets': prefix_sums(product_counts),
+        'password_hash': deterministic_bcrypt(args.password, args.seed, args.bcrypt_rounds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--accounts', type=int, default=None, help='por defecto 10%% de los usuarios')
+    parser.add_argument('--orgs', type=int, default=20_000)
+    parser.add_argument('--products', type=int, default=2_000_000)
+    parser.add_argument('--max-employees', type=int, default=2000)
+    parser.add_argument('--org-size-alpha', type=float, default=1.2,
+                        help='exponente de Pareto; menor = organizaciones más desiguales')
+    parser.add_argument('--roles-per-org', type=int, default=4)
+    parser.add_argument('--attribute-mix', default=DEFAULT_ATTRIBUTE_MIX)
+    parser.add_argument('--password', default='seed-password', help='contraseña de todas las cuentas')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        raise SystemExit('DATABASE_URL es obligatorio')
+    accounts = args.users // 10 if args.accounts is None else min(args.accounts, args.users)
+    dsn = psycopg2_dsn(database_url)
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cursor:
+        plan = build_plan(args, cursor)
+    conn.rollback()
+
+    # Las fases respetan los FKs; dentro de una fase los bloques van en paralelo
+    phases = [
+        chunks('users', args.users, args.chunk_size),
+        chunks('accounts', accounts, args.chunk_size) + chunks('organizations', args.orgs, args.chunk_size),
+        chunks('organization_roles', args.orgs, max(1, args.chunk_size // max(1, args.roles_per_org)))
+        + chunks('products', args.products, args.chunk_size),
+        employee_chunks(plan, args.chunk_size),
+    ]
+
+    started = time.perf_counter()
+    totals = {}
+    with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(dsn, plan)) as pool:
+        for phase in phases:
+            for table, count in pool.imap_unordered(load_chunk, phase):
+                totals[table] = totals.get(table, 0) + count
+                print(f'{table}: {totals[table]} filas', file=sys.stderr)
+
+    with conn.cursor() as cursor:
+        for table in TABLES:
+            if table != 'org_employee_roles':
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+                )
+    conn.commit()
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute(f'ANALYZE {table}')
+    conn.close()
+
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    print(json.dumps({'rows': totals, 'seconds': round(elapsed, 2),
+                      'rows_per_second': round(rows / elapsed) if elapsed else None}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
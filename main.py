@@ -1,12 +1,238 @@
 import os
-from waitress import serve
-from app import main as app_factory
+import sys
+import time
+import errno
+import signal
+import socket
+import logging
+import threading
+from waitress import wasyncore
+from waitress.server import create_server
+from app import main as app_factory, start_background_services
+from app.database import WAITRESS_THREADS, engine, replica_engine
+from app import metrics
+from app.request_body import MAX_REQUEST_BODY_SIZE
+
+# Procesos worker que comparten el socket de escucha (1 = un solo proceso, sin fork)
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 1))
+WAITRESS_CONNECTION_LIMIT = int(os.environ.get("WAITRESS_CONNECTION_LIMIT", 100))
+WAITRESS_BACKLOG = int(os.environ.get("WAITRESS_BACKLOG", 1024))
+# Segundos que un proceso tiene para terminar los requests en curso al detenerse
+SERVER_GRACEFUL_TIMEOUT = float(os.environ.get("SERVER_GRACEFUL_TIMEOUT", 30))
+# Margen del master sobre SERVER_GRACEFUL_TIMEOUT antes de SIGKILL
+SERVER_KILL_GRACE = 5.0
+# Un worker que muere antes de este tiempo se considera en bucle de fallos
+MIN_WORKER_LIFETIME = 1.0
+
+log = logging.getLogger("server")
+
+
+def waitress_options():
+    return dict(
+        threads=WAITRESS_THREADS,
+        connection_limit=WAITRESS_CONNECTION_LIMIT,
+        backlog=WAITRESS_BACKLOG,
+        max_request_body_size=MAX_REQUEST_BODY_SIZE,
+    )
+
+
+def drain(server, timeout=SERVER_GRACEFUL_TIMEOUT):
+    """Stop accepting and keep the loop running until in-flight responses are sent.
+
+    Idle keep-alive connections are closed; connections with a request being
+    read or served are closed once their response has been flushed. Returns
+    False if some were still open after the timeout.
+    """
+    # Only this process's descriptor: a shared listening socket stays open elsewhere
+    wasyncore.dispatcher.close(server)
+    deadline = time.monotonic() + timeout
+    while server.active_channels and time.monotonic() < deadline:
+        for channel in list(server.active_channels.values()):
+            if not channel.requests and channel.request is None and not channel.total_outbufs_len:
+                channel.will_close = True
+        wasyncore.loop(timeout=0.1, map=server._map, use_poll=server.adj.asyncore_use_poll, count=1)
+    server.task_dispatcher.shutdown(timeout=1)
+    return not server.active_channels
+
+
+def run_server(server, stop_signals=(signal.SIGTERM,)):
+    """Serve until one of stop_signals arrives, then drain the connections"""
+    stopping = threading.Event()
+    for signum in stop_signals:
+        signal.signal(signum, lambda signum, frame: stopping.set())
+
+    # A signal interrupts the poll at most asyncore_loop_timeout seconds late
+    while not stopping.is_set():
+        wasyncore.loop(timeout=server.adj.asyncore_loop_timeout, map=server._map,
+                       use_poll=server.adj.asyncore_use_poll, count=1)
+
+    log.info("Process %s draining %d connection(s)", os.getpid(), len(server.active_channels))
+    if not drain(server):
+        log.warning("Process %s closing %d connection(s) still busy after %ss",
+                    os.getpid(), len(server.active_channels), SERVER_GRACEFUL_TIMEOUT)
+
+
+def run_worker(app, sock):
+    """Body of a forked worker: never returns to the master's code"""
+    exit_code = 0
+    try:
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        # Connections inherited from the master must not be shared across processes
+        engine.dispose(close=False)
+        if replica_engine is not None:
+            replica_engine.dispose(close=False)
+        start_background_services()
+
+        server = create_server(app, sockets=[sock], **waitress_options())
+        log.info("Worker %s serving", os.getpid())
+        # SIGTERM (stop or SIGHUP rolling restart): finish running requests, then exit
+        run_server(server)
+    except BaseException:
+        log.exception("Worker %s crashed", os.getpid())
+        exit_code = 1
+    finally:
+        try:
+            # Last snapshot, so the requests of this worker stay in /metrics
+            metrics.multiprocess_metrics.write()
+        except Exception:
+            log.exception("Worker %s could not write its metrics", os.getpid())
+        logging.shutdown()
+        os._exit(exit_code)
+
+
+class Master:
+    """Prefork supervisor: one listening socket, SERVER_WORKERS processes.
+
+    SIGTERM/SIGINT stop the workers gracefully; SIGHUP replaces them one
+    generation at a time (new workers start before the old ones drain).
+    Workers that die unexpectedly are respawned.
+    """
+
+    def __init__(self, app, sock, workers):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.children = {}  # pid -> hora de inicio
+        self.retiring = set()
+        self.stopping = False
+        self.reload_requested = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.app, self.sock)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def signal_children(self, pids, signum):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        """Collect exited workers; return their (pid, lifetime) pairs"""
+        exited = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            if started is not None:
+                code = os.waitstatus_to_exitcode(status)
+                exited.append((pid, time.monotonic() - started))
+                if not self.stopping and pid not in self.retiring:
+                    log.warning("Worker %s exited with code %s", pid, code)
+                self.retiring.discard(pid)
+        return exited
+
+    def rolling_restart(self):
+        log.info("Restarting %d worker(s)", len(self.children))
+        old = list(self.children)
+        self.retiring.update(old)
+        for _ in range(self.workers):
+            self.spawn()
+        self.signal_children(old, signal.SIGTERM)
+
+    def stop(self):
+        self.signal_children(list(self.children), signal.SIGTERM)
+        # Workers give up on busy connections after SERVER_GRACEFUL_TIMEOUT themselves
+        timeout = SERVER_GRACEFUL_TIMEOUT + SERVER_KILL_GRACE
+        deadline = time.monotonic() + timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        if self.children:
+            log.warning("Killing %d worker(s) after %ss", len(self.children), timeout)
+            self.signal_children(list(self.children), signal.SIGKILL)
+            while self.children:
+                self.reap()
+                time.sleep(0.1)
+
+    def run(self):
+        def request_stop(signum, frame):
+            self.stopping = True
+
+        def request_reload(signum, frame):
+            self.reload_requested = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGHUP, request_reload)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_restart()
+            for pid, lifetime in self.reap():
+                if lifetime < MIN_WORKER_LIFETIME:
+                    time.sleep(MIN_WORKER_LIFETIME)  # evita un bucle de fork si falla al arrancar
+            # Tras un SIGHUP los workers viejos salen y no se reemplazan
+            while len(self.children) < self.workers and not self.stopping:
+                self.spawn()
+            time.sleep(0.5)
+
+        log.info("Shutting down %d worker(s)", len(self.children))
+        self.stop()
+
+
+def listen_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind((host, port))
+    except OSError as e:
+        if e.errno == errno.EADDRINUSE:
+            sys.exit(f"Port {port} is already in use")
+        raise
+    sock.listen(WAITRESS_BACKLOG)
+    return sock
+
 
 if __name__ == '__main__':
-    app = app_factory({})
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
 
     port = int(os.environ.get("PORT", 6543))
     host = "0.0.0.0"
 
-    print(f"Server starting at http://{host}:{port}")
-    serve(app, host=host, port=port)
\ No newline at end of file
+    if SERVER_WORKERS > 1 and hasattr(os, "fork"):
+        # La app se carga una vez en el master y los workers la heredan al hacer fork
+        app = app_factory({}, **{'app.defer_background_services': 'true'})
+        metrics.enable_multiprocess()
+        sock = listen_socket(host, port)
+        print(f"Server starting at http://{host}:{port} ({SERVER_WORKERS} workers x {WAITRESS_THREADS} threads)")
+        Master(app, sock, SERVER_WORKERS).run()
+    else:
+        app = app_factory({})
+        server = create_server(app, host=host, port=port, **waitress_options())
+        print(f"Server starting at http://{host}:{port}")
+        run_server(server, stop_signals=(signal.SIGTERM, signal.SIGINT))
@@ -0,0 +1,69 @@
+import os
+import gzip
+import unittest
+
+# El engine se crea al importar app.database pero no se conecta
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/test')
+
+from pyramid.request import Request  # noqa: E402
+from pyramid.response import Response  # noqa: E402
+
+from app.middleware.compression_middleware import compression_tween_factory  # noqa: E402
+
+BODY = b'{"paises": []}' * 200
+
+
+def respond(response, method='GET', accept_encoding='gzip'):
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    request = Request.blank('/api/catalogs', method=method, headers=headers)
+    tween = compression_tween_factory(lambda request: response, None)
+    return tween(request)
+
+
+def json_body():
+    response = Response(body=BODY, content_type='application/json', charset='utf-8')
+    response.etag = 'catalogos-1'
+    return response
+
+
+class CompressionTweenTest(unittest.TestCase):
+
+    def test_compressed_response_varies_on_accept_encoding(self):
+        response = respond(json_body())
+        self.assertEqual(response.content_encoding, 'gzip')
+        self.assertEqual(gzip.decompress(response.body), BODY)
+        self.assertIn('Accept-Encoding', response.vary)
+        self.assertEqual(response.headers['ETag'], 'W/"catalogos-1"')
+
+    def test_not_modified_repeats_vary(self):
+        not_modified = Response(status=304)
+        not_modified.etag = 'catalogos-1'
+        response = respond(not_modified)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(tuple(response.vary), ('Accept-Encoding',))
+        self.assertIsNone(response.content_encoding)
+
+    def test_not_modified_keeps_existing_vary(self):
+        not_modified = Response(status=304)
+        not_modified.vary = ('Origin',)
+        response = respond(not_modified)
+        self.assertEqual(tuple(response.vary), ('Origin', 'Accept-Encoding'))
+
+    def test_uncompressed_response_still_varies(self):
+        response = respond(json_body(), accept_encoding=None)
+        self.assertIsNone(response.content_encoding)
+        self.assertEqual(response.body, BODY)
+        self.assertIn('Accept-Encoding', response.vary)
+
+    def test_head_varies_without_compressing(self):
+        response = respond(json_body(), method='HEAD')
+        self.assertIsNone(response.content_encoding)
+        self.assertIn('Accept-Encoding', response.vary)
+
+    def test_no_content_is_left_alone(self):
+        response = respond(Response(status=204))
+        self.assertIsNone(response.vary)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import time
+import uuid
+import unittest
+from unittest import mock
+
+# El engine se crea al importar app.database pero no se conecta
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/test')
+
+from pyramid import testing  # noqa: E402
+
+from app.views.account_views import logout  # noqa: E402
+from app.middleware.token_revocation import revocation_list  # noqa: E402
+
+
+def logout_request(payload):
+    request = testing.DummyRequest()
+    request.dbsession = mock.Mock()
+    request.auth_error = None
+    request.jwt_payload = payload
+    request.user_id = payload.get('user_id')
+    return request
+
+
+class LogoutTest(unittest.TestCase):
+
+    def test_token_with_jti_is_revoked(self):
+        jti = uuid.uuid4().hex
+        request = logout_request({'user_id': 1, 'exp': time.time() + 60, 'jti': jti})
+        result = logout(request)
+        self.assertEqual(result, {'message': 'Sesión cerrada exitosamente'})
+        request.dbsession.merge.assert_called_once()
+        self.assertEqual(request.dbsession.merge.call_args[0][0].jti, jti)
+        self.assertIn(jti, revocation_list._revoked)
+
+    def test_token_without_jti_is_rejected(self):
+        # Tokens emitidos antes de agregar jti no se pueden revocar
+        request = logout_request({'user_id': 1, 'exp': time.time() + 60})
+        response = logout(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sin jti', response.json_body['error'])
+        request.dbsession.merge.assert_not_called()
+        request.dbsession.commit.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+# El engine se crea al importar app.database pero no se conecta
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/test')
+
+from app.metrics import MetricsRegistry, MultiprocessMetrics, RequestStats  # noqa: E402
+
+DEAD_PID = 2 ** 22 + 1  # por encima de pid_max por defecto: nunca está vivo
+
+
+def observe(registry, route, status, times):
+    stats = RequestStats()
+    stats.queries = 2
+    for _ in range(times):
+        registry.observe_request(route, status, 0.02, stats)
+
+
+class MultiprocessMetricsTest(unittest.TestCase):
+    """En prefork /metrics suma los snapshots de todos los workers"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def exporter(self):
+        registry = MetricsRegistry()
+        return registry, MultiprocessMetrics(registry, self.directory)
+
+    def write_other_worker(self, pid, times):
+        other = MetricsRegistry()
+        observe(other, 'get_user', 200, times)
+        with open(os.path.join(self.directory, f'metrics-{pid}.json'), 'w') as f:
+            json.dump(other.snapshot(), f)
+
+    def test_sums_workers_and_keeps_exited_ones(self):
+        registry, exporter = self.exporter()
+        observe(registry, 'get_user', 200, 3)
+        observe(registry, 'get_user', 404, 1)
+        self.write_other_worker(DEAD_PID, 5)
+
+        body = exporter.render()
+        self.assertIn('http_requests_total{route="get_user",status="200"} 8', body)
+        self.assertIn('http_requests_total{route="get_user",status="404"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{route="get_user"} 9', body)
+        # El worker que salió quedó en el archivo acumulado, no en su propio snapshot
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f'metrics-{DEAD_PID}.json')))
+
+        # Los contadores nunca retroceden entre scrapes
+        observe(registry, 'get_user', 200, 1)
+        self.assertIn('http_requests_total{route="get_user",status="200"} 9', exporter.render())
+
+    def test_reset_starts_from_zero(self):
+        _, exporter = self.exporter()
+        self.write_other_worker(DEAD_PID, 5)
+        exporter.render()
+        exporter.reset()
+        self.assertNotIn('route="get_user"', exporter.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
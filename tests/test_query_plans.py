@@ -0,0 +1,221 @@
+"""
+Planes de consulta de las vistas contra una base PostgreSQL poblada.
+
+Ejecuta cada vista en el mismo proceso (WSGI directo), captura las sentencias
+SQL que emite y las pasa por EXPLAIN (sin ANALYZE, no se ejecutan). Un caso
+por vista: falla si responde 5xx o si algún plan contiene un Seq Scan sobre
+una tabla grande (reltuples >= QUERY_PLAN_MIN_ROWS) que no esté permitido
+para esa ruta en ALLOWED_SEQ_SCANS.
+
+Solo se usan peticiones que no escriben: lecturas y validaciones que fallan
+antes de modificar datos (empleado duplicado, contraseña incorrecta).
+
+Se omite sin DATABASE_URL o si la base no está poblada: los planes solo son
+representativos con volumen real (benchmarks.seed_dataset, que termina con
+ANALYZE).
+
+    DATABASE_URL=postgresql://... python -m pytest tests/test_query_plans.py
+    (QUERY_PLAN_MIN_ROWS=10000, QUERY_PLAN_ORG_ID=N opcionales)
+"""
+import os
+import re
+import json
+import unittest
+import threading
+from collections import namedtuple
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+MIN_ROWS = int(os.getenv('QUERY_PLAN_MIN_ROWS', 10000))
+ORG_ID = os.getenv('QUERY_PLAN_ORG_ID')
+
+# Rutas que recorren la tabla completa a propósito
+ALLOWED_SEQ_SCANS = {
+    'list_public_organizations': {'organizations'},
+}
+
+# Rutas que dependen de una extensión que la base puede no tener instalada
+REQUIRED_EXTENSIONS = {
+    'search_users': 'pg_trgm',
+}
+
+EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+
+Fixture = namedtuple('Fixture', ['org_id', 'owner_id', 'employee_user_id', 'product_id'])
+
+
+def checks(f):
+    """(ruta, método, path, cuerpo) de cada vista verificada"""
+    org = f'/api/organizations/{f.org_id}'
+    return [
+        ('list_public_organizations', 'GET', '/api/public/organizations', None),
+        ('list_products_public', 'GET', f'/api/public/organizations/{f.org_id}/products', None),
+        ('list_catalogs', 'GET', '/api/catalogs', None),
+        ('get_user', 'GET', f'/api/users/{f.owner_id}', None),
+        ('list_users', 'GET', '/api/users?limit=50', None),
+        ('search_users', 'GET', '/api/users/search?q=Mar', None),
+        ('list_org', 'GET', '/api/organizations', None),
+        ('get_org', 'GET', org, None),
+        ('list_employees', 'GET', f'{org}/employees', None),
+        ('list_org_roles', 'GET', f'{org}/roles', None),
+        ('list_products', 'GET', f'{org}/products', None),
+        ('get_product', 'GET', f'{org}/products/{f.product_id}', None),
+        # Ya es empleado: 400 después de buscar (org_id, user_id), sin escribir
+        ('add_employee', 'POST', f'{org}/employees', {'user_id': f.employee_user_id}),
+        # Contraseña incorrecta: 401 después de buscar la cuenta por user_id
+        ('change_password', 'PUT', '/api/accounts/change-password',
+         {'current_password': 'plan-check', 'new_password': 'plan-check'}),
+    ]
+
+ROUTES = [route for route, _, _, _ in checks(Fixture(0, 0, 0, 0))]
+
+
+class StatementCapture:
+    """Guarda las sentencias del hilo actual agrupadas por ruta"""
+
+    def __init__(self, engine):
+        self.route = None
+        self.thread = threading.get_ident()
+        self.statements = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        # Los hilos de fondo (caché de catálogos, revocaciones) no cuentan
+        if self.route is None or executemany or threading.get_ident() != self.thread:
+            return
+        if EXPLAINABLE.match(statement):
+            self.statements.setdefault(self.route, {}).setdefault(statement, parameters)
+
+
+def find_fixture(connection, org_id=None):
+    """Una organización activa con dueño, empleados y productos (None si no hay)"""
+    from sqlalchemy import text
+    row = connection.execute(text("""
+        SELECT o.id, o.owner_id,
+               (SELECT e.user_id FROM organization_employees e
+                 WHERE e.org_id = o.id AND e.user_id IS NOT NULL LIMIT 1),
+               (SELECT p.id FROM products p WHERE p.org_id = o.id LIMIT 1)
+        FROM organizations o
+        WHERE o.is_active AND o.owner_id IS NOT NULL
+          AND (CAST(:org_id AS integer) IS NULL OR o.id = :org_id)
+          AND EXISTS (SELECT 1 FROM products p WHERE p.org_id = o.id)
+          AND EXISTS (SELECT 1 FROM organization_employees e
+                       WHERE e.org_id = o.id AND e.user_id IS NOT NULL)
+        ORDER BY o.id
+        LIMIT 1
+    """), {'org_id': org_id}).first()
+    return Fixture(*row) if row is not None else None
+
+
+def table_sizes(connection):
+    from sqlalchemy import text
+    rows = connection.execute(text("""
+        SELECT c.relname, c.reltuples FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind = 'r' AND n.nspname = current_schema()
+    """))
+    return dict((name, max(int(tuples), 0)) for name, tuples in rows)
+
+
+def seq_scans(plan, limit_cost=None):
+    """Tablas recorridas completas.
+
+    Un Seq Scan bajo un Limit cuyo costo es menor que el del recorrido se corta
+    antes de terminar la tabla (p. ej. el conteo acotado por COUNT_EXACT_THRESHOLD)
+    y no cuenta.
+    """
+    if plan['Node Type'] == 'Limit':
+        limit_cost = plan['Total Cost']
+    if plan['Node Type'] == 'Seq Scan' and (limit_cost is None or limit_cost >= plan['Total Cost']):
+        yield plan['Relation Name']
+    for child in plan.get('Plans', ()):
+        yield from seq_scans(child, limit_cost)
+
+
+def explain(cursor, statement, parameters):
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+@unittest.skipUnless(DATABASE_URL, 'DATABASE_URL no configurada')
+class QueryPlanTest(unittest.TestCase):
+    """Ninguna vista recorre completa una tabla grande"""
+
+    @classmethod
+    def setUpClass(cls):
+        from sqlalchemy import event, text
+        from sqlalchemy.exc import OperationalError
+        from app import main as make_app
+        from app.database import engine
+        from app.middleware.jwt_middleware import create_token
+        from benchmarks.http_bench import InProcessClient
+
+        try:
+            with engine.connect() as connection:
+                fixture = find_fixture(connection, ORG_ID)
+                sizes = table_sizes(connection)
+                extensions = connection.execute(text('SELECT extname FROM pg_extension'))
+                cls.extensions = set(extensions.scalars())
+        except OperationalError as e:
+            raise unittest.SkipTest(f'No se puede conectar a DATABASE_URL: {e.orig}')
+        cls.large = dict((name, rows) for name, rows in sizes.items() if rows >= MIN_ROWS)
+        if fixture is None or not cls.large:
+            raise unittest.SkipTest('Base sin poblar: ejecutar benchmarks.seed_dataset '
+                                    f'(ninguna tabla con {MIN_ROWS} filas o sin organización apta)')
+
+        cls.engine = engine
+        client = InProcessClient(make_app({}))
+        token = create_token({'user_id': fixture.owner_id, 'email': 'plan-check'})
+        capture = StatementCapture(engine)
+        event.listen(engine, 'after_cursor_execute', capture)
+        cls.statuses = {}
+        try:
+            for route, method, path, body in checks(fixture):
+                capture.route = route
+                try:
+                    cls.statuses[route], _ = client.request(method, path, body, token=token)
+                finally:
+                    capture.route = None
+        finally:
+            event.remove(engine, 'after_cursor_execute', capture)
+        cls.statements = capture.statements
+
+    def setUp(self):
+        self.raw = self.engine.raw_connection()
+
+    def tearDown(self):
+        self.raw.rollback()
+        self.raw.close()
+
+    def check_route(self, route):
+        extension = REQUIRED_EXTENSIONS.get(route)
+        if extension and extension not in self.extensions:
+            self.skipTest(f'{route} requiere la extensión {extension}')
+        self.assertLess(self.statuses[route], 500, f'{route} respondió {self.statuses[route]}')
+        statements = self.statements.get(route, {})
+        self.assertTrue(statements, f'{route} no ejecutó ninguna consulta')
+        cursor = self.raw.cursor()
+        for statement, parameters in statements.items():
+            sql = ' '.join(statement.split())[:300]
+            with self.subTest(sql=sql):
+                scanned = set(seq_scans(explain(cursor, statement, parameters)))
+                flagged = sorted(
+                    f'{name} ({self.large[name]:,} filas)' for name in scanned
+                    if name in self.large and name not in ALLOWED_SEQ_SCANS.get(route, ())
+                )
+                self.assertFalse(flagged, f'Seq Scan en {", ".join(flagged)}: {sql}')
+
+
+def _route_test(route):
+    def test(self):
+        self.check_route(route)
+    test.__doc__ = f'Planes de {route}'
+    return test
+
+for _route in ROUTES:
+    setattr(QueryPlanTest, f'test_{_route}', _route_test(_route))
+
+
+if __name__ == '__main__':
+    unittest.main()
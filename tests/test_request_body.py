@@ -0,0 +1,48 @@
+import io
+import os
+import json
+import unittest
+
+# El engine se crea al importar app.database pero no se conecta
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/test')
+
+from app.request_body import JSONArrayReader, JSONStreamError, RequestBodyTooLarge  # noqa: E402
+
+
+def read_array(document, chunk_size, max_bytes=None):
+    stream = io.BytesIO(document.encode('utf-8'))
+    return list(JSONArrayReader(stream, max_bytes=max_bytes, chunk_size=chunk_size))
+
+
+class JSONArrayReaderTest(unittest.TestCase):
+    """Cada documento se lee con todos los tamaños de bloque posibles"""
+
+    def assert_chunked(self, document):
+        expected = json.loads(document)
+        for chunk_size in range(1, len(document.encode('utf-8')) + 2):
+            with self.subTest(document=document, chunk_size=chunk_size):
+                self.assertEqual(read_array(document, chunk_size), expected)
+
+    def test_floats_and_exponents_across_chunk_boundaries(self):
+        self.assert_chunked('[1.5]')
+        self.assert_chunked('[1.5e10, -2E-3, 1e+5, 0.25, 12345, -0]')
+        self.assert_chunked('[{"precio": 19.99, "peso": 1.25e-2}, [2.5, -0.5E1], 3]')
+
+    def test_values_and_whitespace(self):
+        self.assert_chunked('[]')
+        self.assert_chunked(' [ 7 , true ,null, "a,]b" , {"niño": "café"} ] ')
+
+    def test_malformed(self):
+        for document in ('{"a": 1}', '[1,', '[1] x', '', '[1.]', '[1e]', '[1.x]', '[1 2]'):
+            for chunk_size in (1, 2, 3, 64):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    with self.assertRaises(JSONStreamError):
+                        read_array(document, chunk_size)
+
+    def test_max_bytes(self):
+        with self.assertRaises(RequestBodyTooLarge):
+            read_array('[' + ','.join(['1'] * 100) + ']', chunk_size=16, max_bytes=64)
+
+
+if __name__ == '__main__':
+    unittest.main()
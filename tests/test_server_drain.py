@@ -0,0 +1,100 @@
+import os
+import time
+import socket
+import signal
+import unittest
+import threading
+import http.client
+
+# El engine se crea al importar app.database pero no se conecta
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/test')
+
+from waitress.server import create_server  # noqa: E402
+
+import main  # noqa: E402
+
+REQUEST_SECONDS = 1.5
+
+
+def slow_app(environ, start_response):
+    if environ['PATH_INFO'] != '/ping':
+        time.sleep(REQUEST_SECONDS)
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'terminado']
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'requiere fork')
+class GracefulDrainTest(unittest.TestCase):
+    """SIGTERM durante un request: la respuesta se envía completa antes de salir"""
+
+    def setUp(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        self.pid = os.fork()
+        if self.pid == 0:
+            code = 0
+            try:
+                main.run_server(create_server(slow_app, sockets=[self.sock], threads=2))
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        # Con el primer request respondido el proceso ya instaló su manejador de SIGTERM
+        self.assertEqual(self.get('/ping'), (200, b'terminado'))
+
+    def tearDown(self):
+        self.sock.close()
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+            os.waitpid(self.pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+    def get(self, path):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            conn.close()
+
+    def request(self, results):
+        try:
+            results.append(self.get('/'))
+        except OSError as e:
+            results.append(e)
+
+    def test_sigterm_finishes_running_request(self):
+        results = []
+        client = threading.Thread(target=self.request, args=(results,))
+        client.start()
+        time.sleep(REQUEST_SECONDS / 3)  # el request ya está en la vista
+
+        started = time.monotonic()
+        os.kill(self.pid, signal.SIGTERM)
+        client.join(10)
+        _, status = os.waitpid(self.pid, 0)
+
+        self.assertEqual(results, [(200, b'terminado')])
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertLess(time.monotonic() - started, REQUEST_SECONDS + 2)
+
+    def test_idle_keepalive_connection_does_not_delay_exit(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        conn.request('GET', '/ping')
+        conn.getresponse().read()  # la conexión queda abierta (keep-alive)
+        try:
+            started = time.monotonic()
+            os.kill(self.pid, signal.SIGTERM)
+            _, status = os.waitpid(self.pid, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+            self.assertLess(time.monotonic() - started, 3)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import unittest
+from datetime import datetime
+
+# El engine se crea al importar app.database pero no se conecta
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/test')
+
+from app.views.user_views import created_at_filters  # noqa: E402
+
+
+def describe(condition):
+    """(operador, valor) de una comparación sobre User.created_at"""
+    return condition.operator.__name__, condition.right.value
+
+
+class CreatedAtFiltersTest(unittest.TestCase):
+
+    def test_date_only_created_to_covers_the_whole_day(self):
+        # 2024-05-01 incluye lo creado durante todo el 1 de mayo
+        [condition] = created_at_filters(created_to='2024-05-01')
+        self.assertEqual(describe(condition), ('lt', datetime(2024, 5, 2)))
+
+    def test_created_to_with_time_is_inclusive(self):
+        [condition] = created_at_filters(created_to='2024-05-01T12:30:00')
+        self.assertEqual(describe(condition), ('le', datetime(2024, 5, 1, 12, 30)))
+
+    def test_date_only_created_from_starts_at_midnight(self):
+        [condition] = created_at_filters(created_from='2024-05-01')
+        self.assertEqual(describe(condition), ('ge', datetime(2024, 5, 1)))
+
+    def test_same_day_range(self):
+        lower, upper = created_at_filters('2024-05-01', '2024-05-01')
+        self.assertEqual(describe(lower), ('ge', datetime(2024, 5, 1)))
+        self.assertEqual(describe(upper), ('lt', datetime(2024, 5, 2)))
+
+    def test_missing_bounds(self):
+        self.assertEqual(created_at_filters(), [])
+        self.assertEqual(created_at_filters('', ''), [])
+
+    def test_invalid_date(self):
+        with self.assertRaises(ValueError):
+            created_at_filters(created_to='01/05/2024')
+
+
+if __name__ == '__main__':
+    unittest.main()
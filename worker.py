@@ -0,0 +1,23 @@
+import os
+import signal
+import logging
+from app.jobs import JobWorker, JOB_WORKER_THREADS
+from app.catalog_cache import catalog_cache
+
+# Los módulos de vistas registran sus handlers con @job_handler al importarse
+import app.views.user_views  # noqa: F401
+import app.views.organization_views  # noqa: F401
+
+if __name__ == '__main__':
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+
+    # La importación masiva valida contra los catálogos en memoria
+    catalog_cache.start()
+
+    worker = JobWorker(threads=JOB_WORKER_THREADS)
+    # SIGTERM/SIGINT: termina los jobs en curso y sale
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+
+    print(f"Job worker starting ({JOB_WORKER_THREADS} threads)")
+    worker.run()